@@ -0,0 +1,187 @@
+# core/images.py
+"""
+Derivadas de imagem (miniaturas) para Product.image e Course.image.
+
+Para cada imagem original geramos larguras fixas em WebP e JPEG, salvas ao
+lado do original no MEDIA_ROOT:
+
+    products/malbec.jpg -> products/malbec.card.3f9a1c0d2b.webp
+
+O trecho "3f9a1c0d2b" é um hash do arquivo original (nome + tamanho + data),
+então o nome muda sempre que a imagem muda e pode ser cacheado para sempre.
+
+Modos (settings.IMAGE_DERIVATIVES_MODE):
+- 'upload': gera tudo no save do model; o template nunca gera nada;
+- 'lazy': gera na primeira vez que o template pede a imagem.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Larguras (px) de cada "slot" dos templates
+DERIVATIVE_SIZES = {
+    'thumb': 160,
+    'card': 400,
+    'detail': 900,
+}
+
+# extensão -> (formato do Pillow, opções de gravação)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Proporção máxima altura/largura (garrafas são altas, mas não infinitas)
+MAX_ASPECT = 2
+
+logger = logging.getLogger(__name__)
+
+# Memos por processo, todos com tamanho fixo (o catálogo pode crescer à vontade)
+LOCK_STRIPES = 64
+GENERATED_MEMO_SIZE = 4096
+
+# Locks "listrados": a mesma imagem cai sempre no mesmo lock (gera uma vez só),
+# imagens diferentes quase sempre em paralelo
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+_generated_guard = threading.Lock()
+_generated = OrderedDict()  # nomes de derivadas que já sabemos existir (os mais antigos saem primeiro)
+
+
+def derivatives_mode():
+    return getattr(settings, 'IMAGE_DERIVATIVES_MODE', 'lazy')
+
+
+def _lock_for(name):
+    return _locks[zlib.crc32(name.encode()) % LOCK_STRIPES]
+
+
+@lru_cache(maxsize=GENERATED_MEMO_SIZE)
+def _token(name, size, mtime):
+    return hashlib.sha1(f"{name}:{size}:{mtime}".encode()).hexdigest()[:10]
+
+
+def _source_token(name):
+    # stat a cada chamada: se o original for trocado no mesmo nome, o hash (e as derivadas) mudam
+    stat = os.stat(default_storage.path(name))
+    return _token(name, stat.st_size, int(stat.st_mtime))
+
+
+def _remember(name):
+    with _generated_guard:
+        _generated[name] = True
+        _generated.move_to_end(name)
+        if len(_generated) > GENERATED_MEMO_SIZE:
+            _generated.popitem(last=False)
+
+
+def derivative_name(name, size, ext):
+    root, _ = os.path.splitext(name)
+    return f"{root}.{size}.{_source_token(name)}.{ext}"
+
+
+def _render(original, width, image_format, options):
+    image = original.copy()
+    image.thumbnail((width, width * MAX_ASPECT), Image.LANCZOS)
+
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        # JPEG não tem transparência: achatamos sobre fundo branco (igual aos cards)
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def generate_derivatives(field_file):
+    """
+    Gera (se ainda não existirem) todas as derivadas da imagem.
+    Retorna a lista de nomes criados nesta chamada.
+    """
+    if not field_file or not field_file.name or not default_storage.exists(field_file.name):
+        return []
+
+    name = field_file.name
+    missing = [
+        (size, width, ext)
+        for size, width in DERIVATIVE_SIZES.items()
+        for ext in DERIVATIVE_FORMATS
+        if not _derivative_exists(derivative_name(name, size, ext))
+    ]
+    if not missing:
+        return []
+
+    created = []
+    with _lock_for(name), default_storage.open(name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+        for size, width, ext in missing:
+            target = derivative_name(name, size, ext)
+            if default_storage.exists(target):
+                _remember(target)
+                continue
+            image_format, options = DERIVATIVE_FORMATS[ext]
+            default_storage.save(target, ContentFile(_render(original, width, image_format, options)))
+            _remember(target)
+            created.append(target)
+    return created
+
+
+def _derivative_exists(name):
+    if name in _generated:
+        return True
+    if default_storage.exists(name):
+        _remember(name)
+        return True
+    return False
+
+
+def derivative_urls(field_file):
+    """
+    URLs das derivadas: {'webp': {'thumb': url, ...}, 'jpg': {...}}.
+    Retorna None quando não há derivadas disponíveis (o template usa o original).
+    """
+    if not field_file or not field_file.name:
+        return None
+    name = field_file.name
+
+    try:
+        if derivatives_mode() == 'lazy':
+            generate_derivatives(field_file)
+        urls = {}
+        for ext in DERIVATIVE_FORMATS:
+            urls[ext] = {}
+            for size in DERIVATIVE_SIZES:
+                target = derivative_name(name, size, ext)
+                if not _derivative_exists(target):
+                    return None
+                urls[ext][size] = default_storage.url(target)
+        return urls
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # Original sumiu ou não é uma imagem válida: segue com o arquivo original
+        logger.debug("Miniaturas indisponíveis para %s: %s", name, e)
+        return None
+
+
+def generate_on_upload(sender, instance, raw=False, **kwargs):
+    """Receiver de post_save: no modo 'upload' as derivadas nascem junto com o arquivo."""
+    if raw or derivatives_mode() != 'upload':
+        return
+    try:
+        generate_derivatives(instance.image)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("Erro ao gerar miniaturas de %s: %s", instance, e)
@@ -0,0 +1,156 @@
+# core/media.py
+"""
+Entrega dos arquivos de /media/ em produção.
+
+Substitui django.views.static.serve com:
+- ETag forte + Last-Modified (respostas 304 para o navegador/CDN);
+- Range (206) para PDFs e vídeos grandes dos materiais das aulas;
+- Cache-Control longo para miniaturas com hash no nome (ver core/images.py);
+- Repasse para o servidor web via X-Accel-Redirect (nginx) ou X-Sendfile,
+  para que downloads lentos não prendam os workers do gunicorn.
+
+O modo é escolhido em settings.MEDIA_SERVE_MODE: 'django' | 'nginx' | 'sendfile'.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+# Miniaturas geradas por core/images.py: nome.<slot>.<hash de 10>.<ext>
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{10}\.(webp|jpg)$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE = 'public, max-age=3600'
+CHUNK_SIZE = 64 * 1024
+
+
+def _cache_control(path):
+    return IMMUTABLE_CACHE if HASHED_NAME_RE.search(path) else DEFAULT_CACHE
+
+
+def _etag(path, stat):
+    raw = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _parse_range(header, size):
+    """
+    Interpreta um Range de intervalo único ('bytes=0-499', 'bytes=500-', 'bytes=-500').
+    Retorna (inicio, fim) inclusivos, None se não houver Range utilizável,
+    ou False se o intervalo estiver fora do arquivo (416).
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # Sufixo: os últimos N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Arquivo não encontrado.")
+
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404("Arquivo não encontrado.")
+    if not os.path.isfile(full_path):
+        raise Http404("Arquivo não encontrado.")
+
+    etag = _etag(path, stat)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': _cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified[header] = value
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+
+    # --- Repasse para o servidor web: ele cuida do envio (e do Range) ---
+    if mode in ('nginx', 'sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if mode == 'nginx':
+            prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(path)
+        else:
+            response['X-Sendfile'] = full_path
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    # --- Envio pelo próprio Django ---
+    size = stat.st_size
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or if_range == etag:
+        byte_range = _parse_range(request.headers.get('Range'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(full_path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        # FileResponse usa o wsgi.file_wrapper (sendfile no gunicorn) quando disponível
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(size)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -18,6 +18,12 @@ ASAAS_API_URL = os.getenv('ASAAS_BASE_URL') # Verifique se no .env está BASE ou
 ASAAS_API_KEY = os.getenv('ASAAS_API_KEY')
 ASAAS_WEBHOOK_TOKEN = os.getenv('ASAAS_WEBHOOK_TOKEN')
 
+# Cliente HTTP do Asaas (ver financial/asaas.py)
+ASAAS_CONNECT_TIMEOUT = float(os.getenv('ASAAS_CONNECT_TIMEOUT', 3.05))  # segundos para abrir a conexão
+ASAAS_READ_TIMEOUT = float(os.getenv('ASAAS_READ_TIMEOUT', 15))  # segundos esperando a resposta
+ASAAS_BREAKER_THRESHOLD = int(os.getenv('ASAAS_BREAKER_THRESHOLD', 5))  # falhas seguidas para abrir o circuito
+ASAAS_BREAKER_RESET = int(os.getenv('ASAAS_BREAKER_RESET', 30))  # segundos até testar o Asaas de novo
+
 # Log de diagnóstico para o terminal
 if not ASAAS_API_URL:
     print("❌ ERRO: Variável ASAAS_API_URL não encontrada. Verifique o nome no .env")
@@ -55,12 +61,14 @@ INSTALLED_APPS = [
     'courses',
     'financial',
     'pages',
+    'notifications',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'products.middleware.CartCookieMiddleware',
     'core.middleware.UTMMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -154,6 +162,31 @@ else:
     # Localmente no Windows/Pycharm
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Cache
+# 'default' = memória de cada processo (facetas, vocabulário da busca...)
+# 'shared'  = visível para todos os workers do gunicorn (produtos do carrinho, ver products/cart.py).
+#             Padrão: arquivos em disco do container. Com mais de uma instância, aponte
+#             SHARED_CACHE_BACKEND/SHARED_CACHE_LOCATION para um cache comum (ex.: DatabaseCache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': os.getenv('SHARED_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('SHARED_CACHE_LOCATION', os.getenv('SHARED_CACHE_DIR', '/tmp/emporio_della_casa_cache')),
+    },
+}
+
+# Miniaturas de Product.image / Course.image (ver core/images.py)
+# 'lazy' = gera na primeira exibição | 'upload' = gera ao salvar no Admin
+IMAGE_DERIVATIVES_MODE = os.getenv('IMAGE_DERIVATIVES_MODE', 'lazy')
+
+# Entrega de /media/ (ver core/media.py)
+# 'django' = o próprio app envia (com Range/ETag) | 'nginx' = X-Accel-Redirect | 'sendfile' = X-Sendfile
+MEDIA_SERVE_MODE = os.getenv('MEDIA_SERVE_MODE', 'django')
+# Location "internal" do nginx que aponta para o MEDIA_ROOT (usado no modo 'nginx')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-media/')
+
 JAZZMIN_SETTINGS = {
     "site_title": "Empório Della Casa",
     "site_header": "Della Casa Admin",
@@ -225,6 +258,17 @@ CSRF_TRUSTED_ORIGINS = [
     'https://emporiodellacasa.com.br',
 ]
 
+# Carrinho: 'cookie' = cookie assinado (navegação sem escrita no banco) | 'session' = django_session
+# Carrinhos antigos da sessão migram sozinhos para o cookie no primeiro acesso
+CART_STORAGE = os.getenv('CART_STORAGE', 'cookie')
+CART_COOKIE_NAME = 'cart'
+CART_COOKIE_AGE = 60 * 60 * 24 * 30  # 30 dias
+CART_MAX_LINES = 50  # Itens diferentes por carrinho (mantém o cookie abaixo de ~4KB)
+
+# Minutos que o estoque fica reservado para um pedido aguardando pagamento
+# (as reservas vencidas voltam ao estoque com: python manage.py release_expired_holds)
+STOCK_HOLD_MINUTES = int(os.getenv('STOCK_HOLD_MINUTES', 30))
+
 # Após o login, leva o cliente para a área de cursos
 LOGIN_REDIRECT_URL = '/cursos/todos/'
 
@@ -235,7 +279,11 @@ LOGIN_URL = 'login'
 
 # settings.py com DOTENV
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# send_mail só grava na fila (notifications.OutgoingEmail); o worker entrega pelo SMTP abaixo
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'notifications.backends.QueuedEmailBackend')
+EMAIL_DELIVERY_BACKEND = os.getenv('EMAIL_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+# Segundos: um SMTP travado não prende o worker
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 20))
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.hostinger.com')
 
 # Precisamos converter para inteiro manualmente
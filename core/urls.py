@@ -7,8 +7,8 @@ from django.contrib.auth import views as auth_views
 
 from django.conf.urls.static import static
 
-from django.views.static import serve
 from django.urls import re_path
+from core.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -50,7 +50,8 @@ urlpatterns = [
     path('pages/', include('pages.urls', namespace='pages')),
     path('trocas-e-devolucoes/', order_views.trocas_devolucoes, name='trocas'),
     path('prazos-de-entrega/', order_views.envios_prazos, name='envios'),
-    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+    # Mídia com ETag/Range/Cache-Control e repasse opcional ao nginx (ver core/media.py)
+    re_path(r'^media/(?P<path>.*)$', serve_media),
 
 ]
 
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoursesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'courses'
+
+    def ready(self):
+        # Gera as miniaturas da capa do curso no upload (modo 'upload')
+        from . import signals  # noqa: F401
@@ -0,0 +1,7 @@
+# courses/signals.py
+from django.db.models.signals import post_save
+
+from core.images import generate_on_upload
+from .models import Course
+
+post_save.connect(generate_on_upload, sender=Course, dispatch_uid='course_image_derivatives')
@@ -6,6 +6,7 @@ from .forms import CourseEnrollmentForm
 from financial.models import Enrollment
 from products.cart import Cart
 from orders.models import Order, OrderItem
+from orders.outbox import payment_url
 
 from django.http import HttpResponse
 from reportlab.pdfgen import canvas
@@ -189,6 +190,6 @@ def finalize_course_order(request, course_id):
         )
 
         # 3. Chama o processamento de pagamento existente
-        return redirect('orders:process_payment', order_id=order.id)
+        return redirect(payment_url(order.id))
 
     return redirect('courses:course_list')
\ No newline at end of file
@@ -1,9 +1,15 @@
 from django.contrib import admin
-from .models import Enrollment
+from .models import Enrollment, PaymentCustomer
 
 @admin.register(Enrollment)
 class EnrollmentAdmin(admin.ModelAdmin):
     # Remova 'amount' e 'created_at'. Use 'date_enrolled'
     list_display = ['student', 'course', 'status', 'date_enrolled']
     list_filter = ['status', 'course', 'date_enrolled']
-    search_fields = ['student__username', 'course__title']
\ No newline at end of file
+    search_fields = ['student__username', 'course__title']
+
+@admin.register(PaymentCustomer)
+class PaymentCustomerAdmin(admin.ModelAdmin):
+    list_display = ['email', 'asaas_customer_id', 'user', 'updated']
+    search_fields = ['email', 'asaas_customer_id']
+    readonly_fields = ['created', 'updated']
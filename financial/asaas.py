@@ -0,0 +1,152 @@
+"""
+Cliente HTTP único para a API do Asaas.
+
+Usado por orders.gateway_service.AsaasGateway e por financial.services:
+  - uma requests.Session por processo (keep-alive: o checkout reaproveita a
+    conexão TLS em vez de abrir uma nova a cada chamada);
+  - timeouts de conexão e leitura (um Asaas lento não prende o worker do gunicorn);
+  - retentativas com backoff e jitter, só onde é seguro: falha de conexão
+    (a requisição nem saiu) em qualquer método, e erro de leitura/5xx/429
+    apenas em GET/HEAD (POST de cobrança não é repetido às cegas);
+  - circuit breaker: depois de ASAAS_BREAKER_THRESHOLD falhas seguidas, as
+    chamadas falham na hora com AsaasUnavailable por ASAAS_BREAKER_RESET segundos.
+"""
+import os
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+ASAAS_VERSION = 'v3'
+POOL_SIZE = 10  # Conexões mantidas por processo (>= threads do gunicorn)
+
+
+class AsaasUnavailable(Exception):
+    """Asaas fora do ar, lento demais ou circuito aberto."""
+
+
+class CircuitBreaker:
+    """Disjuntor simples por processo: fechado -> aberto (falha rápida) -> meio-aberto (1 teste)."""
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+                raise AsaasUnavailable("Asaas indisponível no momento (circuito aberto).")
+            # Meio-aberto: deixa uma única requisição testar se o Asaas voltou
+            self.trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"❌ Asaas: {self.failures} falhas seguidas, circuito aberto por {self.reset_timeout}s.")
+                self.opened_at = time.monotonic()
+
+
+def get_base_url():
+    """
+    Garante que a URL termine com /api/v3 sem duplicar barras.
+    """
+    base = (settings.ASAAS_API_URL or '').rstrip('/')
+    if not base.endswith(ASAAS_VERSION):
+        base = f"{base}/{ASAAS_VERSION}" if base.endswith('api') else f"{base}/api/{ASAAS_VERSION}"
+    return base
+
+
+def get_headers():
+    """
+    Retorna os cabeçalhos padrão exigidos pela API v3 do Asaas.
+    """
+    return {
+        "Content-Type": "application/json",
+        "access_token": settings.ASAAS_API_KEY,
+        "User-Agent": "Hiancias-System/1.0"  # Boa prática: identificar sua aplicação
+    }
+
+
+def _build_session():
+    retry = Retry(
+        total=3,
+        connect=2,
+        read=2,
+        status=2,
+        backoff_factor=0.3,
+        backoff_jitter=0.5,  # Espalha as retentativas dos workers no tempo
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(get_headers())
+    return session
+
+
+class AsaasClient:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+        self.breaker = CircuitBreaker(settings.ASAAS_BREAKER_THRESHOLD, settings.ASAAS_BREAKER_RESET)
+
+    @property
+    def session(self):
+        # Sessão criada depois do fork do gunicorn: workers não compartilham sockets
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = _build_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def request(self, method, path, **kwargs):
+        """
+        Chama a API (path relativo a /api/v3, ex.: '/payments') e devolve o requests.Response.
+        Levanta AsaasUnavailable em timeout, falha de conexão ou circuito aberto.
+        """
+        self.breaker.before_request()
+        kwargs.setdefault('timeout', (settings.ASAAS_CONNECT_TIMEOUT, settings.ASAAS_READ_TIMEOUT))
+        try:
+            response = self.session.request(method, f"{get_base_url()}{path}", **kwargs)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise AsaasUnavailable(f"Falha ao chamar o Asaas ({method} {path}): {e}") from e
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+
+asaas = AsaasClient()
@@ -0,0 +1,58 @@
+"""
+Cache local dos clientes do Asaas (PaymentCustomer).
+
+No primeiro contato o id do cliente é gravado por e-mail normalizado; nas compras
+seguintes ele é reaproveitado sem chamar GET /customers. O id só é revalidado
+quando o Asaas recusa (cliente apagado/inválido): aí o registro é esquecido e o
+fluxo normal de busca/criação roda de novo.
+"""
+from .models import PaymentCustomer
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def get_customer(email):
+    """Registro em cache para o e-mail, ou None."""
+    email = normalize_email(email)
+    if not email:
+        return None
+    return PaymentCustomer.objects.filter(email=email).first()
+
+
+def get_customer_by_id(customer_id):
+    return PaymentCustomer.objects.select_related('user').filter(asaas_customer_id=customer_id).first()
+
+
+def remember_customer(email, customer_id, user=None, cpf_cnpj=None):
+    """Grava (ou atualiza) o id do cliente no Asaas para o e-mail."""
+    email = normalize_email(email)
+    if not email or not customer_id:
+        return None
+    defaults = {'asaas_customer_id': customer_id}
+    if user is not None:
+        defaults['user'] = user
+    if cpf_cnpj is not None:
+        defaults['cpf_cnpj'] = cpf_cnpj
+    customer, _ = PaymentCustomer.objects.update_or_create(email=email, defaults=defaults)
+    return customer
+
+
+def forget_customer_id(customer_id):
+    """Esquece um id que o Asaas recusou; a próxima compra busca/cria o cliente de novo."""
+    PaymentCustomer.objects.filter(asaas_customer_id=customer_id).delete()
+    print(f"⚠️ Asaas recusou o cliente {customer_id}: removido do cache local.")
+
+
+def is_invalid_customer(response):
+    """True se a resposta do Asaas indica que o id de cliente enviado não existe mais."""
+    if response.status_code == 404:
+        return True
+    if response.status_code != 400:
+        return False
+    try:
+        errors = response.json().get('errors') or []
+    except ValueError:
+        return False
+    return any(error.get('code') == 'invalid_customer' for error in errors)
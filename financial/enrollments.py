@@ -0,0 +1,60 @@
+"""
+Liberação de cursos em lote a partir de pedidos pagos.
+
+Um pedido pode ter vários cursos e a liberação pode cobrir milhares de pedidos
+(ex.: depois de uma importação). Em vez de get_or_create + save por item, são
+sempre três queries por lote: itens de curso dos pedidos, alunos pelos e-mails
+e um INSERT ... ON CONFLICT (student, course) DO UPDATE SET status = 'paid'.
+"""
+from django.contrib.auth.models import User
+from django.db.models.functions import Lower
+
+from orders.models import OrderItem
+from .models import Enrollment
+
+GRANT_BATCH_SIZE = 1000
+
+
+def grant_order_courses(orders, batch_size=GRANT_BATCH_SIZE):
+    """
+    Libera (status 'paid') os cursos dos pedidos informados (queryset, lista de
+    pedidos ou de ids). O aluno é achado pelo e-mail do pedido, sem diferenciar
+    maiúsculas. Retorna (matrículas liberadas, e-mails sem usuário).
+    """
+    pairs = (
+        OrderItem.objects.filter(order__in=orders, course__isnull=False)
+        .values_list('order__email', 'course_id')
+    )
+    courses_by_email = {}
+    for email, course_id in pairs:
+        courses_by_email.setdefault((email or '').strip().lower(), set()).add(course_id)
+    if not courses_by_email:
+        return 0, []
+
+    # Se houver mais de um usuário com o mesmo e-mail, fica o mais antigo (como o get do webhook)
+    students = {}
+    for user_id, email in (
+        User.objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=courses_by_email).order_by('-id').values_list('id', 'email_lower')
+    ):
+        students[email] = user_id
+
+    enrollments = [
+        Enrollment(student_id=students[email], course_id=course_id, status='paid')
+        for email, course_ids in courses_by_email.items() if email in students
+        for course_id in course_ids
+    ]
+    Enrollment.objects.bulk_create(
+        enrollments,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['student', 'course'],
+        update_fields=['status'],
+    )
+
+    missing = sorted(email for email in courses_by_email if email not in students)
+    for email in missing:
+        print(f"⚠️ Usuário com email {email} não encontrado. Curso não liberado.")
+    if enrollments:
+        print(f"🎓 {len(enrollments)} matrículas liberadas.")
+    return len(enrollments), missing
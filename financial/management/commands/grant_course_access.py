@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from financial.enrollments import GRANT_BATCH_SIZE, grant_order_courses
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Libera (ou libera de novo) os cursos de pedidos pagos em lote, ex.: depois de uma importação."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order', type=int, nargs='+', dest='orders', help="Só estes pedidos (ids).")
+        parser.add_argument('--start', help="Pedidos criados a partir do dia (AAAA-MM-DD).")
+        parser.add_argument('--end', help="Pedidos criados até o dia (AAAA-MM-DD).")
+        parser.add_argument('--batch-size', type=int, default=GRANT_BATCH_SIZE, help="Pedidos por lote.")
+
+    def handle(self, *args, **options):
+        start = self.parse_day(options['start'])
+        end = self.parse_day(options['end'])
+
+        orders = Order.objects.filter(paid=True, has_courses=True)
+        if options['orders']:
+            orders = orders.filter(id__in=options['orders'])
+        if start:
+            orders = orders.filter(created__date__gte=start)
+        if end:
+            orders = orders.filter(created__date__lte=end)
+
+        order_ids = list(orders.order_by('id').values_list('id', flat=True))
+        granted, missing = 0, set()
+        batch_size = options['batch_size']
+        for i in range(0, len(order_ids), batch_size):
+            batch_granted, batch_missing = grant_order_courses(order_ids[i:i + batch_size], batch_size=batch_size)
+            granted += batch_granted
+            missing.update(batch_missing)
+
+        if missing:
+            self.stdout.write(self.style.WARNING(f"⚠️ {len(missing)} e-mails sem usuário cadastrado."))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {granted} matrículas liberadas em {len(order_ids)} pedidos pagos."
+        ))
+
+    def parse_day(self, value):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError as e:
+            raise CommandError(f"Data inválida: {value} ({e})")
+        if day is None:
+            # parse_date devolve None quando o texto nem tem o formato AAAA-MM-DD
+            raise CommandError(f"Data inválida: {value} (use AAAA-MM-DD)")
+        return day
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 13:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financial', '0003_delete_coupon_alter_enrollment_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCustomer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('asaas_customer_id', models.CharField(max_length=50, verbose_name='ID no Asaas')),
+                ('cpf_cnpj', models.CharField(blank=True, default='', max_length=20, verbose_name='CPF/CNPJ')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_customers', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cliente Asaas',
+                'verbose_name_plural': 'Clientes Asaas',
+            },
+        ),
+    ]
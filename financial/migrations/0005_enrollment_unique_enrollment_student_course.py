@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 13:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_enrollments(apps, schema_editor):
+    """Remove matrículas repetidas (aluno, curso) antes da constraint: fica a paga, senão a mais antiga."""
+    Enrollment = apps.get_model('financial', 'Enrollment')
+    duplicates = (
+        Enrollment.objects.values('student_id', 'course_id')
+        .annotate(total=Count('id')).filter(total__gt=1)
+    )
+    for pair in duplicates:
+        rows = list(
+            Enrollment.objects.filter(student_id=pair['student_id'], course_id=pair['course_id'])
+            .order_by('id').values_list('id', 'status')
+        )
+        keep = next((row_id for row_id, status in rows if status == 'paid'), rows[0][0])
+        Enrollment.objects.filter(id__in=[row_id for row_id, _ in rows if row_id != keep]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_image_course_is_active'),
+        ('financial', '0004_paymentcustomer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_enrollments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_enrollment_student_course'),
+        ),
+    ]
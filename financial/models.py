@@ -8,5 +8,31 @@ class Enrollment(models.Model):
     date_enrolled = models.DateTimeField(auto_now_add=True) # Nome padrão para evitar erros no Admin
     status = models.CharField(max_length=20, default='paid')
 
+    class Meta:
+        constraints = [
+            # Uma matrícula por aluno e curso: permite liberar em lote com bulk_create(update_conflicts=True)
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_enrollment_student_course'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.course.title}"
+
+class PaymentCustomer(models.Model):
+    """
+    Cliente já cadastrado no Asaas, por e-mail normalizado (ver financial/customers.py).
+    Evita buscar/criar o cliente na API a cada checkout.
+    """
+    email = models.EmailField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='payment_customers')
+    asaas_customer_id = models.CharField('ID no Asaas', max_length=50)
+    # CPF/CNPJ enviado no cadastro: se o cliente informar outro, o cadastro no Asaas é atualizado
+    cpf_cnpj = models.CharField('CPF/CNPJ', max_length=20, blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Cliente Asaas'
+        verbose_name_plural = 'Clientes Asaas'
+
     def __str__(self):
-        return f"{self.student.username} - {self.course.title}"
\ No newline at end of file
+        return f"{self.email} -> {self.asaas_customer_id}"
@@ -0,0 +1,100 @@
+"""
+Processamento único dos eventos de pagamento do Asaas (pedidos e matrículas).
+
+Toda cobrança criada pelo site leva um externalReference com o tipo na frente:
+'order:123' (carrinho / curso via pedido) ou 'enrollment:45' (checkout direto
+de curso). Assim cada evento vai direto ao registro certo, com uma busca por
+chave primária. Ids sem prefixo (cobranças antigas) ainda são aceitos: tenta
+pedido e depois matrícula, como o webhook fazia.
+
+Chamado pelo worker (orders/webhooks.py); os efeitos são idempotentes.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order
+from orders.reservations import commit_reservations
+from orders.rollup import record_paid_order
+from .enrollments import grant_order_courses
+from .models import Enrollment
+
+CONFIRMATION_EVENTS = ('PAYMENT_RECEIVED', 'PAYMENT_CONFIRMED')
+ORDER_PREFIX = 'order'
+ENROLLMENT_PREFIX = 'enrollment'
+
+
+def order_reference(order_id):
+    return f"{ORDER_PREFIX}:{order_id}"
+
+
+def enrollment_reference(enrollment_id):
+    return f"{ENROLLMENT_PREFIX}:{enrollment_id}"
+
+
+def parse_reference(external_ref):
+    """
+    'order:123' -> ('order', 123); 'enrollment:45' -> ('enrollment', 45);
+    '123' (legado) -> (None, 123). Referência inválida -> (None, None).
+    """
+    kind, _, value = str(external_ref or '').strip().rpartition(':')
+    if kind not in ('', ORDER_PREFIX, ENROLLMENT_PREFIX) or not (value.isascii() and value.isdigit()):
+        return None, None
+    return kind or None, int(value)
+
+
+def confirm_order(order):
+    """Marca o pedido como pago (uma vez só) e libera os cursos dele."""
+    # UPDATE condicional: se o Asaas reenviar o evento, só a primeira entrega muda o pedido
+    if Order.objects.filter(id=order.id, paid=False).update(paid=True, status='paid', updated=timezone.now()):
+        order.paid = True
+        order.status = 'paid'
+        commit_reservations(order)
+        record_paid_order(order)
+        print(f"✅ Webhook: Pedido {order.id} processado como ORDER.")
+
+    # Libera cursos vinculados à Order (todos de uma vez)
+    if order.has_courses:
+        grant_order_courses([order.id])
+    return 'order_processed'
+
+
+def confirm_enrollment(enrollment):
+    """Marca a matrícula como paga (uma vez só) e avisa o aluno."""
+    if Enrollment.objects.filter(id=enrollment.id).exclude(status='paid').update(status='paid'):
+        print(f"✅ Webhook: Matrícula {enrollment.id} processada como ENROLLMENT.")
+        # E-mail só depois do commit: se a transação do evento cair, ninguém recebe aviso falso
+        transaction.on_commit(lambda: send_mail(
+            f'Acesso Liberado: {enrollment.course.title}',
+            'Seu pagamento foi confirmado.',
+            settings.DEFAULT_FROM_EMAIL,
+            [enrollment.student.email],
+            fail_silently=True
+        ))
+    return 'enrollment_processed'
+
+
+def process_payment_event(event, payment):
+    """Aplica um evento de pagamento. Retorna o que foi feito ('order_processed', 'ignored', ...)."""
+    external_ref = payment.get('externalReference')
+    if event not in CONFIRMATION_EVENTS or not external_ref:
+        return 'ignored'
+
+    kind, object_id = parse_reference(external_ref)
+    if object_id is None:
+        print(f"❌ ERRO: Referência {external_ref} inválida.")
+        return 'not_found'
+
+    if kind in (ORDER_PREFIX, None):
+        order = Order.objects.filter(id=object_id).first()
+        if order is not None:
+            return confirm_order(order)
+
+    if kind in (ENROLLMENT_PREFIX, None):
+        enrollment = Enrollment.objects.select_related('course', 'student').filter(id=object_id).first()
+        if enrollment is not None:
+            return confirm_enrollment(enrollment)
+
+    print(f"❌ ERRO: Referência {external_ref} não encontrada.")
+    return 'not_found'
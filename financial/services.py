@@ -1,36 +1,13 @@
-import requests
 from django.conf import settings
 from datetime import datetime, timedelta
 
-# Definição explícita da versão e headers padrão
-ASAAS_VERSION = 'v3'
-
-
-def get_headers():
-    """
-    Retorna os cabeçalhos padrão exigidos pela API v3 do Asaas.
-    """
-    return {
-        "Content-Type": "application/json",
-        "access_token": settings.ASAAS_API_KEY,
-        "User-Agent": "Hiancias-System/1.0"  # Boa prática: identificar sua aplicação
-    }
-
-
-def get_base_url():
-    """
-    Garante que a URL termine com /api/v3 sem duplicar barras.
-    """
-    base = settings.ASAAS_API_URL.rstrip('/')
-    if not base.endswith(ASAAS_VERSION):
-        base = f"{base}/{ASAAS_VERSION}" if base.endswith('api') else f"{base}/api/{ASAAS_VERSION}"
-    return base
+# Cliente compartilhado (pool de conexões, timeouts, retentativas e circuit breaker)
+from .asaas import asaas
+from .customers import (forget_customer_id, get_customer, get_customer_by_id, is_invalid_customer,
+                        remember_customer)
 
 
 def create_asaas_customer(user, cpf=None):
-    url = f"{get_base_url()}/customers"
-    headers = get_headers()
-
     # Tratamento do CPF
     cpf_to_send = cpf or user.profile.cpf
     if cpf_to_send:
@@ -46,12 +23,31 @@ def create_asaas_customer(user, cpf=None):
         "notificationDisabled": False,  # Opcional: permite Asaas enviar email pro cliente
     }
 
+    # Cliente já conhecido com o mesmo CPF: nenhuma chamada à API
+    cached = get_customer(user.email)
+    if cached and cached.cpf_cnpj == (cpf_to_send or ''):
+        return cached.asaas_customer_id
+
     try:
+        if cached:
+            # CPF novo para um cliente conhecido: basta atualizar o cadastro
+            update_response = asaas.post(f"/customers/{cached.asaas_customer_id}", json=payload)
+            if update_response.status_code == 200:
+                remember_customer(user.email, cached.asaas_customer_id, user=user, cpf_cnpj=cpf_to_send or '')
+                return cached.asaas_customer_id
+            if not is_invalid_customer(update_response):
+                print(f"DEBUG SERVICE - Falha ao atualizar: {update_response.text}")
+                return None
+            # Id recusado pelo Asaas: segue o fluxo completo de criação/busca
+            forget_customer_id(cached.asaas_customer_id)
+
         # TENTATIVA 1: CRIAR
-        response = requests.post(url, json=payload, headers=headers)
+        response = asaas.post('/customers', json=payload)
 
         if response.status_code == 200:
-            return response.json().get('id')
+            customer_id = response.json().get('id')
+            remember_customer(user.email, customer_id, user=user, cpf_cnpj=cpf_to_send or '')
+            return customer_id
 
         # TENTATIVA 2: SE EXISTE (Erro 400), ATUALIZAR
         if response.status_code == 400:
@@ -59,7 +55,7 @@ def create_asaas_customer(user, cpf=None):
 
             if error_code == 'invalid_customer' or 'already exists' in response.text:
                 # Busca pelo email
-                search_response = requests.get(f"{url}?email={user.email}", headers=headers)
+                search_response = asaas.get('/customers', params={'email': user.email})
 
                 if search_response.status_code == 200:
                     data = search_response.json()
@@ -67,10 +63,10 @@ def create_asaas_customer(user, cpf=None):
                         existing_id = data['data'][0]['id']
 
                         # ATUALIZA O CADASTRO EXISTENTE COM O CPF NOVO
-                        update_url = f"{url}/{existing_id}"
-                        update_response = requests.post(update_url, json=payload, headers=headers)
+                        update_response = asaas.post(f"/customers/{existing_id}", json=payload)
 
                         if update_response.status_code == 200:
+                            remember_customer(user.email, existing_id, user=user, cpf_cnpj=cpf_to_send or '')
                             return existing_id
                         else:
                             print(f"DEBUG SERVICE - Falha ao atualizar: {update_response.text}")
@@ -85,9 +81,6 @@ def create_asaas_customer(user, cpf=None):
 
 
 def create_asaas_payment(customer_id, value, description, external_ref):
-    url = f"{get_base_url()}/payments"
-    headers = get_headers()
-
     payload = {
         "customer": customer_id,
         "billingType": "UNDEFINED",  # Permite Pix, Boleto e Cartão
@@ -99,7 +92,17 @@ def create_asaas_payment(customer_id, value, description, external_ref):
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = asaas.post('/payments', json=payload)
+
+        # Id do cache recusado: recria o cliente (mesmo usuário e CPF) e tenta uma vez
+        if is_invalid_customer(response):
+            cached = get_customer_by_id(customer_id)
+            forget_customer_id(customer_id)
+            if cached and cached.user:
+                payload["customer"] = create_asaas_customer(cached.user, cpf=cached.cpf_cnpj or None)
+                if payload["customer"]:
+                    response = asaas.post('/payments', json=payload)
+
         if response.status_code == 200:
             return response.json()
         else:
@@ -1,3 +1,77 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from courses.models import Course
+from orders.models import Order, OrderItem
+from .enrollments import grant_order_courses
+from .models import Enrollment
+from .payment_events import enrollment_reference, order_reference, parse_reference
+
+
+class ParseReferenceTests(SimpleTestCase):
+    def test_prefixed_references(self):
+        self.assertEqual(parse_reference(order_reference(12)), ('order', 12))
+        self.assertEqual(parse_reference(enrollment_reference(45)), ('enrollment', 45))
+        self.assertEqual(parse_reference(' order:7 '), ('order', 7))
+
+    def test_bare_legacy_id(self):
+        self.assertEqual(parse_reference('77'), (None, 77))
+        self.assertEqual(parse_reference(77), (None, 77))
+
+    def test_garbage(self):
+        for value in (None, '', 'order:', 'order:abc', 'order:²', 'invoice:12', 'order:-1', 'order:1.5', 'abc', '12a'):
+            with self.subTest(value=value):
+                self.assertEqual(parse_reference(value), (None, None))
+
+
+class GrantOrderCoursesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('ana', 'ana@x.com', 'senha')
+        cls.courses = [Course.objects.create(title=title, price=100) for title in ('Sommelier', 'Harmonização')]
+        cls.order = Order.objects.create(
+            kind='course', has_courses=True, paid=True, first_name='Ana', last_name='Silva', email=' Ana@X.com ',
+            phone='(11) 98888-7777', address='Acesso Digital', number='0', postal_code='00000000',
+            city='Digital', state='SP',
+        )
+        for course in cls.courses:
+            OrderItem.objects.create(order=cls.order, course=course, product=None, price=course.price, quantity=1)
+        cls.orphan = Order.objects.create(
+            kind='course', has_courses=True, paid=True, first_name='Bia', last_name='Souza', email='bia@x.com',
+            phone='(11) 97777-6666', address='Acesso Digital', number='0', postal_code='00000000',
+            city='Digital', state='SP',
+        )
+        OrderItem.objects.create(order=cls.orphan, course=cls.courses[0], product=None, price=100, quantity=1)
+
+    def test_grant_is_idempotent(self):
+        self.assertEqual(grant_order_courses([self.order.id, self.orphan.id]), (2, ['bia@x.com']))
+        self.assertEqual(grant_order_courses(Order.objects.filter(id=self.order.id)), (2, []))
+
+        enrollments = Enrollment.objects.filter(student=self.student)
+        self.assertEqual(enrollments.count(), 2)
+        self.assertEqual(set(enrollments.values_list('status', flat=True)), {'paid'})
+
+    def test_existing_enrollment_is_updated(self):
+        Enrollment.objects.create(student=self.student, course=self.courses[0], status='pending')
+
+        grant_order_courses([self.order])
+
+        self.assertEqual(Enrollment.objects.filter(student=self.student).count(), 2)
+        self.assertEqual(Enrollment.objects.get(student=self.student, course=self.courses[0]).status, 'paid')
+
+    def test_no_course_items(self):
+        self.assertEqual(grant_order_courses([]), (0, []))
+
+    def test_command_rejects_malformed_dates(self):
+        for option in ('--start', '--end'):
+            for value in ('ontem', '2026-13-40'):
+                with self.subTest(option=option, value=value):
+                    with self.assertRaisesMessage(CommandError, "Data inválida"):
+                        call_command('grant_course_access', option, value, stdout=StringIO())
+        self.assertFalse(Enrollment.objects.exists())
+
+        call_command('grant_course_access', '--start', '2000-01-01', stdout=StringIO())
+        self.assertEqual(Enrollment.objects.count(), 2)
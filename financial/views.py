@@ -16,6 +16,9 @@ from .models import Enrollment  # App Financial
 from orders.models import Order  # App Orders
 from coupons.models import Coupon  # App Coupons
 from .services import create_asaas_customer, create_asaas_payment
+from .payment_events import enrollment_reference
+# Webhook único do Asaas (grava o evento; o processamento fica em financial/payment_events.py)
+from orders.views import asaas_webhook  # noqa: F401
 
 
 @login_required
@@ -88,7 +91,7 @@ def checkout(request, course_id):
                 customer_id=customer_id,
                 value=final_price,
                 description=f"Curso: {course.title}",
-                external_ref=str(enrollment.id)
+                external_ref=enrollment_reference(enrollment.id)
             )
 
             if payment_data and 'invoiceUrl' in payment_data:
@@ -117,81 +120,3 @@ def checkout(request, course_id):
 
 def payment_success(request):
     return render(request, 'financial/dashboard.html')
-
-
-@csrf_exempt
-def asaas_webhook(request):
-    """
-    Webhook Híbrido: Aceita pagamentos via Order (Carrinho) e via Enrollment (Checkout Direto)
-    """
-    if request.method == 'POST':
-        token_recebido = request.headers.get('asaas-access-token')
-        if token_recebido != settings.ASAAS_WEBHOOK_TOKEN:
-            return JsonResponse({'error': 'Unauthorized'}, status=401)
-
-        try:
-            data = json.loads(request.body)
-            event = data.get('event')
-            payment = data.get('payment', {})
-            external_ref = payment.get('externalReference')  # Pode ser ID de Order OU de Enrollment
-
-            CONFIRMATION_EVENTS = ['PAYMENT_RECEIVED', 'PAYMENT_CONFIRMED']
-
-            if event in CONFIRMATION_EVENTS and external_ref:
-
-                # --- TENTATIVA 1: Tenta achar como ORDER (Fluxo novo) ---
-                try:
-                    order = Order.objects.get(id=external_ref)
-                    if not order.paid:
-                        order.paid = True
-                        order.status = 'paid'
-                        order.save()
-                        print(f"✅ Webhook: Pedido {order.id} processado como ORDER.")
-
-                    # Libera cursos vinculados à Order
-                    try:
-                        student_user = User.objects.get(email=order.email)
-                        for item in order.items.all():
-                            if item.course:
-                                enrollment, _ = Enrollment.objects.get_or_create(
-                                    student=student_user,
-                                    course=item.course,
-                                    defaults={'status': 'paid'}
-                                )
-                                enrollment.status = 'paid'
-                                enrollment.save()
-                    except User.DoesNotExist:
-                        pass  # Usuário não encontrado
-
-                    return JsonResponse({'status': 'order_processed'})
-
-                except (Order.DoesNotExist, ValueError):
-                    # --- TENTATIVA 2: Tenta achar como ENROLLMENT (Fluxo antigo deste checkout) ---
-                    # Se falhou ao buscar Order, tenta buscar Enrollment direto
-                    try:
-                        enrollment = Enrollment.objects.get(id=external_ref)
-                        if enrollment.status != 'paid':
-                            enrollment.status = 'paid'
-                            enrollment.save()
-                            print(f"✅ Webhook: Matrícula {enrollment.id} processada como ENROLLMENT.")
-
-                            # Envia e-mail simples
-                            send_mail(
-                                f'Acesso Liberado: {enrollment.course.title}',
-                                'Seu pagamento foi confirmado.',
-                                settings.DEFAULT_FROM_EMAIL,
-                                [enrollment.student.email],
-                                fail_silently=True
-                            )
-                        return JsonResponse({'status': 'enrollment_processed'})
-                    except (Enrollment.DoesNotExist, ValueError):
-                        print(f"❌ ERRO: Referência {external_ref} não encontrada nem como Order nem como Enrollment.")
-
-            return JsonResponse({'status': 'received'})
-
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
-
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
\ No newline at end of file
@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status', 'created']
+    search_fields = ['subject', 'to']
+    readonly_fields = ['attempts', 'last_error', 'created', 'updated', 'sent_at']
+    # Conteúdo fora do Admin: pode ser um link de recuperação de senha
+    exclude = ['body', 'alternatives', 'attachments']
+    actions = ['retry_now']
+
+    @admin.action(description='Reenviar e-mails selecionados agora')
+    def retry_now(self, request, queryset):
+        # Enviados já não têm conteúdo (apagado depois do envio): só falhas e fila
+        updated = queryset.exclude(status__in=['sending', 'sent']).update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"✅ {updated} e-mails de volta na fila.")
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .models import OutgoingEmail
+from .sender import serialize_message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """
+    EMAIL_BACKEND que só grava as mensagens na fila (OutgoingEmail); quem
+    conversa com o SMTP é o worker (notifications/sender.py).
+    """
+
+    def send_messages(self, email_messages):
+        queued, direct = [], []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            email = serialize_message(message)
+            if email is None:
+                direct.append(message)
+            else:
+                queued.append(email)
+
+        try:
+            OutgoingEmail.objects.bulk_create(queued)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+
+        sent = len(queued)
+        if direct:
+            # Anexos MIME prontos não são serializados: seguem pelo envio direto
+            connection = get_connection(settings.EMAIL_DELIVERY_BACKEND, fail_silently=self.fail_silently)
+            sent += connection.send_messages(direct) or 0
+        return sent
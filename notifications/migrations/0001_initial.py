@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-18 13:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutgoingEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.TextField(blank=True, default='', verbose_name='Assunto')),
+                ('from_email', models.CharField(max_length=255, verbose_name='Remetente')),
+                ('to', models.JSONField(default=list, verbose_name='Para')),
+                ('cc', models.JSONField(blank=True, default=list)),
+                ('bcc', models.JSONField(blank=True, default=list)),
+                ('reply_to', models.JSONField(blank=True, default=list)),
+                ('headers', models.JSONField(blank=True, default=dict)),
+                ('body', models.TextField(blank=True, default='', verbose_name='Mensagem')),
+                ('content_subtype', models.CharField(default='plain', max_length=20)),
+                ('alternatives', models.JSONField(blank=True, default=list)),
+                ('attachments', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('pending', 'Na fila'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('failed', 'Falhou')], default='pending', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último erro')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado em')),
+            ],
+            options={
+                'verbose_name': 'E-mail',
+                'verbose_name_plural': 'E-mails',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='outgoingemail_pending_idx')],
+            },
+        ),
+    ]
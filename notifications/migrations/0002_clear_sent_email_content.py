@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-18 14:05
+
+from django.db import migrations
+
+
+def clear_sent_content(apps, schema_editor):
+    """E-mails já enviados não guardam mais o conteúdo (links de recuperação de senha)."""
+    OutgoingEmail = apps.get_model('notifications', 'OutgoingEmail')
+    OutgoingEmail.objects.filter(status='sent').update(body='', alternatives=[], attachments=[])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_sent_content, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutgoingEmail(models.Model):
+    """
+    E-mail na fila de envio (ver notifications/sender.py). Gravado pelo
+    EMAIL_BACKEND da fila no lugar do envio SMTP; o worker entrega em lote.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Na fila'),
+        ('sending', 'Enviando'),
+        ('sent', 'Enviado'),
+        ('failed', 'Falhou'),
+    ]
+    subject = models.TextField('Assunto', blank=True, default='')
+    from_email = models.CharField('Remetente', max_length=255)
+    to = models.JSONField('Para', default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    body = models.TextField('Mensagem', blank=True, default='')
+    content_subtype = models.CharField(max_length=20, default='plain')
+    # [[conteúdo, mimetype], ...] (ex.: versão HTML do e-mail de recuperação de senha)
+    alternatives = models.JSONField(default=list, blank=True)
+    # [{'filename', 'content', 'mimetype', 'base64'}, ...]
+    attachments = models.JSONField(default=list, blank=True)
+
+    status = models.CharField('Status', max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('Tentativas', default=0)
+    next_attempt_at = models.DateTimeField('Próxima tentativa', default=timezone.now)
+    last_error = models.TextField('Último erro', blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField('Enviado em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'E-mail'
+        verbose_name_plural = 'E-mails'
+        indexes = [
+            # O worker só procura e-mails na fila, pela ordem de vencimento
+            models.Index(fields=['next_attempt_at'], name='outgoingemail_pending_idx',
+                         condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
@@ -0,0 +1,181 @@
+"""
+Fila de e-mails (OutgoingEmail) e o envio em lote.
+
+  1. settings.EMAIL_BACKEND = 'notifications.backends.QueuedEmailBackend':
+     todo send_mail / EmailMessage.send() do site só grava a mensagem (um
+     INSERT) e volta na hora. Dentro de uma transação, o e-mail só existe se
+     ela for confirmada.
+  2. O worker (python manage.py run_worker) pega os e-mails vencidos com
+     SELECT ... FOR UPDATE SKIP LOCKED e entrega todos por uma única conexão
+     SMTP (settings.EMAIL_DELIVERY_BACKEND), com status por mensagem.
+     Falhas voltam para a fila com backoff exponencial + jitter.
+  3. Se nem a conexão abre (SMTP fora do ar, senha errada), o lote para na
+     hora: o resto volta para a fila sem contar tentativa, em vez de esperar
+     EMAIL_TIMEOUT por mensagem.
+  4. Depois de enviado, o conteúdo (corpo, HTML, anexos) é apagado: e-mails de
+     recuperação de senha não ficam guardados no banco.
+"""
+import base64
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+EMAIL_MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# E-mail 'sending' sem atualização há mais que isso = worker morreu no meio: volta para a fila
+STALE_AFTER = timedelta(minutes=10)
+
+
+def serialize_message(message):
+    """OutgoingEmail (não salvo) com o conteúdo da mensagem, ou None se ela não couber na fila."""
+    attachments = []
+    for attachment in message.attachments:
+        if not isinstance(attachment, tuple):
+            return None  # Parte MIME pronta (MIMEBase): envia direto, sem fila
+        filename, content, mimetype = attachment
+        if isinstance(content, bytes):
+            content, encoded = base64.b64encode(content).decode('ascii'), True
+        else:
+            encoded = False
+        attachments.append({'filename': filename, 'content': content, 'mimetype': mimetype, 'base64': encoded})
+
+    return OutgoingEmail(
+        subject=message.subject or '',
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+        body=message.body or '',
+        content_subtype=message.content_subtype,
+        alternatives=[[content, mimetype] for content, mimetype in getattr(message, 'alternatives', [])],
+        attachments=attachments,
+    )
+
+
+def build_message(email, connection=None):
+    """Reconstrói a EmailMessage a partir do registro da fila."""
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        cc=email.cc,
+        bcc=email.bcc,
+        reply_to=email.reply_to,
+        headers=email.headers,
+        connection=connection,
+    )
+    message.content_subtype = email.content_subtype
+    for content, mimetype in email.alternatives:
+        message.attach_alternative(content, mimetype)
+    for attachment in email.attachments:
+        content = attachment['content']
+        if attachment['base64']:
+            content = base64.b64decode(content)
+        message.attach(attachment['filename'], content, attachment['mimetype'])
+    return message
+
+
+def retry_delay(attempts):
+    """Espera antes da próxima tentativa: 30s, 1min, 2min... até 1h, com ±50% de jitter."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+def requeue_stale_emails():
+    """Devolve para a fila e-mails presos em 'sending' por um worker que caiu."""
+    now = timezone.now()
+    return OutgoingEmail.objects.filter(status='sending', updated__lt=now - STALE_AFTER).update(
+        status='pending', next_attempt_at=now, updated=now
+    )
+
+
+def claim_emails(limit=50):
+    """Reserva até `limit` e-mails vencidos para este worker (outros workers pulam as linhas travadas)."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        OutgoingEmail.objects.filter(id__in=ids).update(status='sending', attempts=F('attempts') + 1, updated=now)
+    return list(OutgoingEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def _record_failure(email, error):
+    email.last_error = f"{error.__class__.__name__}: {error}"
+    if email.attempts >= EMAIL_MAX_ATTEMPTS:
+        email.status = 'failed'
+        print(f"❌ E-mail {email.id} para {', '.join(email.to)} falhou após {email.attempts} tentativas: {error}")
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        print(f"⚠️ E-mail {email.id} (tentativa {email.attempts}) falhou, nova tentativa em breve: {error}")
+
+
+def _release(emails, error):
+    """Devolve para a fila e-mails que nem chegaram a ser tentados (a tentativa não conta)."""
+    now = timezone.now()
+    OutgoingEmail.objects.filter(id__in=[email.id for email in emails]).update(
+        status='pending',
+        attempts=F('attempts') - 1,
+        next_attempt_at=now + retry_delay(1),
+        last_error=f"{error.__class__.__name__}: {error}",
+        updated=now,
+    )
+    print(f"⚠️ Servidor de e-mail indisponível ({error}): {len(emails)} e-mails voltaram para a fila.")
+
+
+def send_queued_emails(limit=50):
+    """Um ciclo do worker: entrega até `limit` e-mails por uma única conexão. Retorna quantos tentou."""
+    requeue_stale_emails()
+    emails = claim_emails(limit)
+    if not emails:
+        return 0
+
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND, fail_silently=False)
+    processed = emails
+    try:
+        for index, email in enumerate(emails):
+            try:
+                connection.open()  # Já aberta: não faz nada; depois de uma falha, reconecta
+            except OSError as e:
+                # smtplib.SMTPException é um OSError: falha de conexão/login vale para o lote todo
+                _release(emails[index:], e)
+                processed = emails[:index]
+                break
+
+            try:
+                if not connection.send_messages([build_message(email, connection)]):
+                    raise ValueError("Mensagem sem destinatários.")
+            except Exception as e:
+                # Conexão possivelmente quebrada: a próxima mensagem abre outra
+                connection.close()
+                _record_failure(email, e)
+            else:
+                email.status = 'sent'
+                email.last_error = ''
+                email.sent_at = timezone.now()
+                email.body, email.alternatives, email.attachments = '', [], []
+            email.save(update_fields=[
+                'status', 'last_error', 'next_attempt_at', 'sent_at', 'body', 'alternatives', 'attachments', 'updated'
+            ])
+    finally:
+        connection.close()
+
+    sent = sum(email.status == 'sent' for email in processed)
+    if sent:
+        print(f"📧 {sent} e-mails enviados.")
+    return len(processed)
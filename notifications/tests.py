@@ -0,0 +1,66 @@
+import smtplib
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import send_mail
+from django.test import TestCase, override_settings
+
+from .admin import OutgoingEmailAdmin
+from .models import OutgoingEmail
+from .sender import send_queued_emails
+
+QUEUED = 'notifications.backends.QueuedEmailBackend'
+LOCMEM = 'django.core.mail.backends.locmem.EmailBackend'
+
+
+@override_settings(EMAIL_BACKEND=QUEUED, EMAIL_DELIVERY_BACKEND=LOCMEM)
+class SendQueuedEmailsTests(TestCase):
+    def queue(self, count=1):
+        for i in range(count):
+            send_mail(f'Assunto {i}', 'Link secreto', 'loja@x.com', [f'cliente{i}@x.com'],
+                      html_message='<a>Link secreto</a>')
+
+    def test_send_mail_only_queues(self):
+        self.queue()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.get().status, 'pending')
+
+    def test_sent_emails_drop_their_content(self):
+        self.queue(2)
+        self.assertEqual(send_queued_emails(), 2)
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<a>Link secreto</a>')
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual((email.status, email.attempts, email.body, email.alternatives), ('sent', 1, '', []))
+            self.assertIsNotNone(email.sent_at)
+
+    def test_connection_failure_releases_batch_without_counting(self):
+        self.queue(3)
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open',
+                        side_effect=smtplib.SMTPConnectError(421, 'fora do ar')) as smtp_open:
+            self.assertEqual(send_queued_emails(), 0)
+
+        smtp_open.assert_called_once()
+        self.assertEqual(len(mail.outbox), 0)
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual((email.status, email.attempts, email.body), ('pending', 0, 'Link secreto'))
+            self.assertIn('SMTPConnectError', email.last_error)
+        # Só volta depois do backoff
+        self.assertEqual(send_queued_emails(), 0)
+
+    def test_message_failure_counts_attempt(self):
+        self.queue()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=smtplib.SMTPRecipientsRefused({})):
+            self.assertEqual(send_queued_emails(), 1)
+
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertEqual(email.body, 'Link secreto')
+
+
+class OutgoingEmailAdminTests(TestCase):
+    def test_content_is_not_shown(self):
+        for field in ('body', 'alternatives', 'attachments'):
+            self.assertIn(field, OutgoingEmailAdmin.exclude)
@@ -1,8 +1,15 @@
-from django.contrib import admin
-from django.db.models import Sum, Avg, Count
+from django.contrib import admin, messages
+from django.db.models import Sum, Avg, Count, Case, OuterRef, Subquery, When
+from django.db.models.functions import Upper
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-from .models import Order, OrderItem, OrderDashboard, ShippingRate, OrderCourse, OrderWine
+from .models import (Order, OrderItem, OrderDashboard, ShippingRate, OrderCourse, OrderWine, StockReservation,
+                     PaymentJob, WebhookEvent)
+from financial.enrollments import grant_order_courses
+from .exports import export_response
+from .reservations import commit_reservations
+from .rollup import default_period, record_order_change, rollup_entry, sales_summary
 
 
 class OrderItemInline(admin.TabularInline):
@@ -12,19 +19,73 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ['product', 'course']
     extra = 0
 
+
+class OrderExportMixin:
+    """Ações de exportação (CSV/XLSX por streaming) para as listas de pedidos."""
+    actions = ['export_as_csv', 'export_as_xlsx']
+    export_filename = 'pedidos'
+
+    @admin.action(description='Exportar pedidos e itens para CSV')
+    def export_as_csv(self, request, queryset):
+        return export_response(queryset, 'csv', self.export_filename)
+
+    @admin.action(description='Exportar pedidos e itens para Excel (XLSX)')
+    def export_as_xlsx(self, request, queryset):
+        return export_response(queryset, 'xlsx', self.export_filename)
+
+
+class OrderRollupMixin:
+    """Mantém o resumo diário de vendas em dia com as edições do pedido no Admin."""
+
+    def save_model(self, request, obj, form, change):
+        # Como o pedido estava no resumo antes desta edição (lido do banco, não do form)
+        previous = Order.objects.select_related('coupon').filter(pk=obj.pk).first() if change else None
+        obj._rollup_before = rollup_entry(previous) if previous else None
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Itens, frete ou desconto podem ter mudado no Admin
+        form.instance.refresh_totals()
+        form.instance.update_item_flags()
+        record_order_change(getattr(form.instance, '_rollup_before', None), rollup_entry(form.instance))
+
+
+class StockReservationInline(admin.TabularInline):
+    model = StockReservation
+    fields = ['product', 'quantity', 'status', 'expires_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class PaymentJobInline(admin.TabularInline):
+    model = PaymentJob
+    fields = ['status', 'attempts', 'next_attempt_at', 'invoice_url', 'last_error']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 # --- 1. REMOVEMOS O @admin.register(Order) PARA EVITAR DUPLICIDADE ---
 
 @admin.register(OrderWine)
-class OrderWineAdmin(admin.ModelAdmin):
+class OrderWineAdmin(OrderRollupMixin, OrderExportMixin, admin.ModelAdmin):
     """Admin focado exclusivamente em Vinhos com Logística Completa"""
+    export_filename = 'pedidos-vinhos'
     list_display = [
         'id', 'first_name', 'state', 'shipping_method',
-        'status', 'tracking_code', 'estimated_delivery_date', 'paid', 'created'
+        'status', 'tracking_code', 'delivery_estimate', 'paid', 'created'
     ]
     list_editable = ['status', 'tracking_code']
     list_filter = ['status', 'paid', 'state', 'created']
     search_fields = ['first_name', 'email', 'id']
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, StockReservationInline, PaymentJobInline]
 
     # Reaproveitamos seus fieldsets originais aqui (com endereço e frete)
     fieldsets = (
@@ -34,19 +95,45 @@ class OrderWineAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        # Filtro: Apenas pedidos que possuem produtos físicos (Vinhos)
-        return super().get_queryset(request).filter(items__product__isnull=False).distinct()
+        # Filtro: Apenas pedidos com produtos físicos (índice parcial, sem join/distinct nos itens)
+        # + prazo de entrega da tabela de fretes calculado no próprio SELECT da lista
+        # UF em maiúsculas dos dois lados (como o iexact de antes; a tabela pode ter 'sp')
+        rates = ShippingRate.objects.annotate(state_upper=Upper('state')).filter(
+            state_upper=Upper(OuterRef('state'))
+        )
+        return super().get_queryset(request).filter(has_physical_items=True).annotate(
+            delivery_days=Case(
+                When(shipping_method='sedex', then=Subquery(rates.values('sedex_days')[:1])),
+                When(shipping_method='delivery', then=Subquery(rates.values('delivery_days')[:1])),
+                default=Subquery(rates.values('pac_days')[:1]),
+            )
+        )
+
+    @admin.display(description='Previsão de Entrega')
+    def delivery_estimate(self, obj):
+        """Mesma regra de Order.estimated_delivery_date, usando o prazo anotado na query."""
+        if not obj.paid or obj.delivery_days is None:
+            return None
+        return obj.updated + timedelta(days=obj.delivery_days)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Pagamento confirmado manualmente: a reserva de estoque não pode mais expirar
+        if obj.paid:
+            commit_reservations(obj)
 
 
 # orders/admin.py
 
 @admin.register(OrderCourse)
-class OrderCourseAdmin(admin.ModelAdmin):
+class OrderCourseAdmin(OrderRollupMixin, OrderExportMixin, admin.ModelAdmin):
     """Admin focado exclusivamente em Cursos (Sem campos de frete/rastreio)"""
+    export_filename = 'pedidos-cursos'
     list_display = ['id', 'first_name', 'email', 'paid', 'created']
     list_filter = ['paid', 'created']
     search_fields = ['first_name', 'email', 'id']
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, PaymentJobInline]
+    actions = OrderExportMixin.actions + ['grant_courses']
 
     fieldsets = (
         ('Informações do Aluno', {'fields': ('first_name', 'last_name', 'email', 'phone')}),
@@ -54,75 +141,94 @@ class OrderCourseAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        return super().get_queryset(request).filter(items__course__isnull=False).distinct()
+        return super().get_queryset(request).filter(has_courses=True)
 
-    # --- PASSO 3: LIBERAÇÃO MANUAL AO SALVAR NO ADMIN ---
-    def save_model(self, request, obj, form, change):
-        """
-        Executa ao salvar o pedido no Admin. Se marcado como 'paid',
-        tenta encontrar o usuário pelo e-mail e libera o curso.
-        """
-        # Primeiro, salva o pedido normalmente no banco de dados
-        super().save_model(request, obj, form, change)
+    def save_related(self, request, form, formsets, change):
+        # Totais, flags e resumo de vendas no OrderRollupMixin
+        super().save_related(request, form, formsets, change)
+
+        # --- PASSO 3: LIBERAÇÃO MANUAL AO SALVAR NO ADMIN ---
+        # Depois dos itens salvos: pedido pago libera todos os cursos dele de uma vez
+        if form.instance.paid:
+            grant_order_courses([form.instance.id])
+
+    @admin.action(description='Liberar cursos dos pedidos pagos selecionados')
+    def grant_courses(self, request, queryset):
+        granted, missing = grant_order_courses(queryset.filter(paid=True))
+        self.message_user(request, f"✅ {granted} matrículas liberadas.")
+        if missing:
+            self.message_user(
+                request, f"⚠️ {len(missing)} e-mails sem usuário cadastrado: {', '.join(missing[:10])}",
+                level=messages.WARNING,
+            )
 
-        # Se o pedido foi marcado como pago (paid=True)
-        if obj.paid:
-            from django.contrib.auth.models import User
-            from financial.models import Enrollment
-
-            try:
-                # Busca o usuário pelo e-mail registrado no pedido
-                user = User.objects.get(email__iexact=obj.email)
-
-                # Percorre os itens do pedido para encontrar os cursos
-                for item in obj.items.all():
-                    if item.course:
-                        # Cria ou atualiza a matrícula para status 'paid'
-                        enrollment, created = Enrollment.objects.get_or_create(
-                            student=user,
-                            course=item.course,
-                            defaults={'status': 'paid'}
-                        )
-                        if not created and enrollment.status != 'paid':
-                            enrollment.status = 'paid'
-                            enrollment.save()
-
-                        print(f"✅ Curso '{item.course.title}' liberado manualmente para {user.email}")
-
-            except User.DoesNotExist:
-                print(f"⚠️ Aviso: Usuário com e-mail {obj.email} não encontrado. Curso não liberado.")
-            except Exception as e:
-                print(f"❌ Erro na liberação manual: {e}")
+
+def _parse_day(value):
+    """Data AAAA-MM-DD da querystring, ou None se vazia/inválida."""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
 
 
 @admin.register(OrderDashboard)
 class OrderDashboardAdmin(admin.ModelAdmin):
-    # Seu código de Dashboard permanece igual, pois ele deve somar TUDO
+    # Os números vêm do resumo diário (DailySalesRollup): custo constante para qualquer período
     change_list_template = 'admin/sales_dashboard.html'
 
     def changelist_view(self, request, extra_context=None):
-        last_30_days = timezone.now() - timedelta(days=30)
-        orders = self.get_queryset(request).filter(created__gte=last_30_days)
-
-        total_sales = sum(order.get_total_cost() for order in orders)
-        count_orders = orders.count()
-        avg_ticket = total_sales / count_orders if count_orders > 0 else 0
-
-        top_coupons = orders.values('coupon__code').annotate(
-            total=Count('id')
-        ).order_by('-total')[:5]
+        # Tira start/end da querystring antes do ChangeList (ele rejeita parâmetros desconhecidos)
+        request.GET = request.GET.copy()
+        start = _parse_day(request.GET.pop('start', [''])[0])
+        end = _parse_day(request.GET.pop('end', [''])[0])
+        default_start, default_end = default_period()
+        start, end = start or default_start, end or default_end
+        if start > end:
+            start, end = end, start
 
         extra_context = extra_context or {}
+        extra_context.update(sales_summary(start, end))
         extra_context.update({
-            'total_sales': total_sales,
-            'avg_ticket': avg_ticket,
-            'count_orders': count_orders,
-            'top_coupons': top_coupons,
-            'title': 'Relatório de Vendas Geral (30 dias)'
+            'start': start,
+            'end': end,
+            'title': f'Relatório de Vendas Geral ({start:%d/%m/%Y} a {end:%d/%m/%Y})'
         })
         return super().changelist_view(request, extra_context=extra_context)
 
 @admin.register(ShippingRate)
 class ShippingRateAdmin(admin.ModelAdmin):
     list_display = ['state', 'pac_cost', 'sedex_cost', 'delivery_cost']
-    list_editable = ['pac_cost', 'sedex_cost', 'delivery_cost']
\ No newline at end of file
+    list_editable = ['pac_cost', 'sedex_cost', 'delivery_cost']
+
+
+@admin.register(PaymentJob)
+class PaymentJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'order', 'status', 'attempts', 'next_attempt_at', 'updated']
+    list_filter = ['status']
+    search_fields = ['order__id', 'order__email', 'asaas_payment_id']
+    list_select_related = ['order']
+    readonly_fields = ['order', 'attempts', 'asaas_payment_id', 'invoice_url', 'last_error', 'created', 'updated']
+    actions = ['retry_now']
+
+    @admin.action(description='Tentar gerar a cobrança novamente agora')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status__in=['done', 'running']).update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"✅ {updated} cobranças de volta na fila.")
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event', 'payment_id', 'external_reference', 'status', 'attempts', 'received_at']
+    list_filter = ['status', 'event']
+    search_fields = ['payment_id', 'external_reference']
+    readonly_fields = ['payment_id', 'event', 'external_reference', 'payload', 'attempts', 'last_error',
+                       'received_at', 'next_attempt_at', 'processed_at']
+    actions = ['replay']
+
+    @admin.action(description='Reprocessar eventos selecionados')
+    def replay(self, request, queryset):
+        updated = queryset.update(status='pending', attempts=0, last_error='', processed_at=None,
+                                  next_attempt_at=timezone.now())
+        self.message_user(request, f"✅ {updated} eventos de volta na fila.")
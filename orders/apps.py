@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class OrdersConfig(AppConfig):
     name = 'orders'
+
+    def ready(self):
+        # Registra os signals que invalidam a tabela de fretes em memória
+        from . import signals  # noqa: F401
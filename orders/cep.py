@@ -0,0 +1,100 @@
+"""
+Resolve CEP -> UF no servidor, sem rede.
+
+As faixas de CEP de cada UF (orders/data/cep_ranges.csv, tabela dos Correios)
+são compiladas num arquivo binário ordenado (cep_ranges.bin) com registros de
+tamanho fixo: início (uint32), fim (uint32) e UF (2 bytes). O arquivo é aberto
+uma vez por processo com mmap e a busca é um bisect sobre os inícios, sem
+copiar nada para a memória do Python.
+
+Depois de editar o CSV: python manage.py build_cep_index
+"""
+import bisect
+import csv
+import mmap
+import re
+import struct
+import threading
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+CEP_RANGES_CSV = DATA_DIR / 'cep_ranges.csv'
+CEP_INDEX_PATH = DATA_DIR / 'cep_ranges.bin'
+
+RECORD = struct.Struct('<II2s')
+
+_lock = threading.Lock()
+_index = None
+
+
+class _RangeIndex:
+    """Vista de sequência sobre o mmap: index[i] é o início da i-ésima faixa (para o bisect)."""
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.size = len(buffer) // RECORD.size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return RECORD.unpack_from(self.buffer, i * RECORD.size)[0]
+
+    def record(self, i):
+        start, end, uf = RECORD.unpack_from(self.buffer, i * RECORD.size)
+        return start, end, uf.decode('ascii')
+
+
+def _get_index():
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                with open(CEP_INDEX_PATH, 'rb') as f:
+                    # O mapeamento continua válido depois de fechar o arquivo
+                    _index = _RangeIndex(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    return _index
+
+
+def normalize_cep(value):
+    """Só os dígitos do CEP, ou None se não tiver 8 dígitos."""
+    digits = re.sub(r'\D', '', value or '')
+    return digits if len(digits) == 8 else None
+
+
+def resolve_uf(cep):
+    """UF do CEP (ex.: '01310-100' -> 'SP') ou None se o CEP for inválido/fora das faixas."""
+    digits = normalize_cep(cep)
+    if digits is None:
+        return None
+
+    number = int(digits)
+    index = _get_index()
+    i = bisect.bisect_right(index, number) - 1
+    if i < 0:
+        return None
+    start, end, uf = index.record(i)
+    return uf if number <= end else None
+
+
+def build_cep_index(csv_path=CEP_RANGES_CSV, index_path=CEP_INDEX_PATH):
+    """Compila o CSV de faixas no índice binário. Retorna o número de faixas."""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        ranges = sorted(
+            (int(row['start']), int(row['end']), row['uf'].strip().upper())
+            for row in csv.DictReader(f)
+        )
+
+    for (start, end, uf), following in zip(ranges, ranges[1:] + [None]):
+        if start > end or len(uf) != 2:
+            raise ValueError(f"Faixa inválida: {start}-{end} {uf}")
+        if following and following[0] <= end:
+            raise ValueError(f"Faixas sobrepostas: {start}-{end} {uf} e {following[0]}-{following[1]} {following[2]}")
+
+    tmp_path = Path(index_path).with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        for start, end, uf in ranges:
+            f.write(RECORD.pack(start, end, uf.encode('ascii')))
+    # Troca atômica: processos com o arquivo antigo mapeado não são afetados
+    tmp_path.replace(index_path)
+    return len(ranges)
@@ -0,0 +1,214 @@
+"""
+Exportação de pedidos (com itens, cupom, UTM e frete) em CSV ou XLSX, por streaming.
+
+Os pedidos são lidos em blocos com queryset.iterator(chunk_size=...) e os itens
+vêm por prefetch de cada bloco: a memória fica constante e o download começa
+antes da consulta terminar. Uma linha por item (os dados do pedido se repetem);
+pedidos sem itens saem numa linha só.
+
+O XLSX é montado à mão (zipfile + XML com strings inline), sem dependência
+nova: cada bloco de linhas é compactado e enviado na hora.
+"""
+import csv
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import OrderItem
+
+EXPORT_CHUNK_SIZE = 500
+
+HEADERS = [
+    'Pedido', 'Data', 'Tipo', 'Pago', 'Status da Entrega',
+    'Nome', 'Sobrenome', 'E-mail', 'WhatsApp',
+    'CEP', 'Endereço', 'Número', 'Complemento', 'Cidade', 'UF',
+    'Método de Envio', 'Frete', 'Código de Rastreio',
+    'Cupom', 'Desconto (%)', 'Subtotal', 'Desconto', 'Total',
+    'utm_source', 'utm_medium', 'utm_campaign',
+    'Item', 'Tipo do Item', 'Quantidade', 'Preço Unitário', 'Total do Item',
+]
+
+
+def export_queryset(queryset):
+    """Queryset pronto para exportar: cupom por join e itens (com produto/curso) por prefetch."""
+    items = OrderItem.objects.select_related('product', 'course').order_by('id')
+    return queryset.select_related('coupon').prefetch_related(Prefetch('items', queryset=items))
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Gera as linhas (listas de valores) de cada item de cada pedido."""
+    for order in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        order_values = [
+            order.id,
+            timezone.localtime(order.created).strftime('%d/%m/%Y %H:%M'),
+            order.get_kind_display(),
+            'Sim' if order.paid else 'Não',
+            order.get_status_display(),
+            order.first_name, order.last_name, order.email, order.phone,
+            order.postal_code, order.address, order.number, order.complement or '', order.city, order.state,
+            order.get_shipping_method_display(), Decimal(order.shipping_cost), order.tracking_code or '',
+            order.coupon.code if order.coupon else '', order.discount,
+            order.subtotal, order.discount_amount, order.get_total_cost(),
+            order.utm_source or '', order.utm_medium or '', order.utm_campaign or '',
+        ]
+
+        items = list(order.items.all())
+        if not items:
+            yield order_values + [''] * 5
+            continue
+
+        for item in items:
+            if item.course:
+                name, kind = item.course.title, 'Curso'
+            elif item.product:
+                name, kind = item.product.name, 'Vinho'
+            else:
+                name, kind = 'Produto removido', ''
+            yield order_values + [name, kind, item.quantity, item.price, item.get_cost()]
+
+
+# --- CSV ---
+
+class _Echo:
+    """Pseudo-arquivo: o csv.writer devolve a linha em vez de guardar (padrão da documentação do Django)."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    # BOM para o Excel abrir com acentos corretos
+    yield '\ufeff' + writer.writerow(HEADERS)
+    for row in export_rows(queryset, chunk_size):
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+# --- XLSX ---
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Pedidos" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+# Caracteres de controle não são aceitos em XML
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Pipe:
+    """Destino do zipfile que acumula os bytes até o gerador buscá-los (arquivo não-seekable)."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+_COLUMNS = [_column_letter(i) for i in range(len(HEADERS))]
+
+
+def _xlsx_row(number, values):
+    cells = []
+    for column, value in zip(_COLUMNS, values):
+        ref = f'{column}{number}'
+        if value is None or value == '':
+            continue
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_ILLEGAL_XML.sub('', str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def stream_xlsx(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK)
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield pipe.take()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((_SHEET_START + _xlsx_row(1, HEADERS)).encode('utf-8'))
+            for number, row in enumerate(export_rows(queryset, chunk_size), start=2):
+                sheet.write(_xlsx_row(number, row).encode('utf-8'))
+                if number % chunk_size == 0:
+                    yield pipe.take()
+            sheet.write(_SHEET_END.encode('utf-8'))
+    yield pipe.take()
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def export_response(queryset, file_format, filename='pedidos'):
+    """StreamingHttpResponse com o arquivo de pedidos no formato pedido ('csv' ou 'xlsx')."""
+    stream, content_type = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(stream(queryset), content_type=content_type)
+    stamp = timezone.localtime().strftime('%Y%m%d-%H%M')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{file_format}"'
+    return response
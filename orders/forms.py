@@ -1,5 +1,6 @@
 from django import forms
 from .models import Order
+from .cep import resolve_uf
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 
@@ -48,6 +49,23 @@ class OrderCreateForm(forms.ModelForm):
         postal_code = self.cleaned_data['postal_code']
         return postal_code.replace('-', '').replace('.', '')
 
+    def clean(self):
+        """Confere a UF com o CEP (índice local de faixas): não confia só no preenchimento do navegador"""
+        cleaned_data = super().clean()
+        postal_code = cleaned_data.get('postal_code')
+        if not postal_code:
+            return cleaned_data
+
+        cep_uf = resolve_uf(postal_code)
+        if cep_uf is None:
+            self.add_error('postal_code', "CEP inválido.")
+            return cleaned_data
+
+        state = (cleaned_data.get('state') or '').strip().upper()
+        if state and state != cep_uf:
+            self.add_error('state', f"O CEP informado pertence a {cep_uf}, não a {state}.")
+        return cleaned_data
+
     def clean_phone(self):
         phone = self.cleaned_data.get('phone')
         # Remove parênteses, espaços e traços para contar apenas os números
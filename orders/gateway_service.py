@@ -1,15 +1,13 @@
-import requests
 from datetime import datetime, timedelta
-from django.conf import settings
+from financial.asaas import asaas
+from financial.payment_events import order_reference
+from financial.customers import forget_customer_id, get_customer, is_invalid_customer, remember_customer
+
 
 class AsaasGateway:
     def __init__(self):
-        self.api_key = settings.ASAAS_API_KEY
-        self.api_url = settings.ASAAS_API_URL
-        self.headers = {
-            'access_token': self.api_key,
-            'Content-Type': 'application/json'
-        }
+        # Cliente compartilhado do processo: keep-alive, timeouts, retentativas e circuit breaker
+        self.client = asaas
 
     def create_payment(self, order, billing_type='UNDEFINED'):
         """
@@ -24,24 +22,45 @@ class AsaasGateway:
             "description": f"Pedido #{order.id} - Empório Della Casa",
             "customer": self.get_or_create_customer(order),
             "dueDate": due_date,
-            "externalReference": str(order.id)
+            "externalReference": order_reference(order.id)
         }
 
-        response = requests.post(f"{self.api_url}/payments", json=payload, headers=self.headers)
+        response = self.client.post('/payments', json=payload)
+
+        # Id do cache recusado (cliente apagado no Asaas): esquece e tenta uma vez com o cliente atualizado
+        if payload["customer"] and is_invalid_customer(response):
+            forget_customer_id(payload["customer"])
+            payload["customer"] = self.get_or_create_customer(order)
+            response = self.client.post('/payments', json=payload)
+
         return response.json()
 
+    def find_payment(self, external_ref):
+        """Cobrança já criada para a referência (ex.: 'order:123'), ou None. Evita cobrança duplicada ao repetir."""
+        response = self.client.get('/payments', params={'externalReference': str(external_ref)})
+        if response.status_code != 200:
+            return None
+        data = response.json().get('data') or []
+        return data[0] if data else None
+
     def get_or_create_customer(self, order, cpf_form=None):
         """
         Busca o cliente pelo e-mail. Se não encontrar, cria um novo.
+        Clientes já vistos saem do cache local (PaymentCustomer), sem chamar a API.
         """
+        cached = get_customer(order.email)
+        if cached:
+            return cached.asaas_customer_id
+
         # 1. Tentar buscar o cliente existente por e-mail
-        search_url = f"{self.api_url}/customers?email={order.email}"
-        search_response = requests.get(search_url, headers=self.headers)
+        search_response = self.client.get('/customers', params={'email': order.email})
         search_data = search_response.json()
 
         # Se encontrou o cliente na lista 'data', retorna o ID do primeiro
         if search_data.get('data'):
-            return search_data['data'][0]['id']
+            customer_id = search_data['data'][0]['id']
+            remember_customer(order.email, customer_id)
+            return customer_id
 
         # 2. Se não encontrou, criar um novo
         customer_data = {
@@ -52,10 +71,11 @@ class AsaasGateway:
             "notificationDisabled": True
         }
 
-        response = requests.post(f"{self.api_url}/customers", json=customer_data, headers=self.headers)
+        response = self.client.post('/customers', json=customer_data)
         data = response.json()
 
         if 'id' in data:
+            remember_customer(order.email, data['id'], cpf_cnpj=customer_data['cpfCnpj'])
             return data['id']
 
         # Log de erro caso a criação falhe (ajuda muito na depuração)
@@ -65,11 +85,8 @@ class AsaasGateway:
 
     def get_pix_qr_code(self, payment_id):
         """Busca o QR Code e a chave copia e cola de uma cobrança Pix"""
-        url = f"{self.api_url}/payments/{payment_id}/pixQrCode"
-        response = requests.get(url, headers=self.headers)
-
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.client.get(f"/payments/{payment_id}/pixQrCode")
             if response.status_code == 200:
                 return response.json()
             else:
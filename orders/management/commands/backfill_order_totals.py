@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.totals import backfill_order_totals
+
+
+class Command(BaseCommand):
+    help = "Preenche subtotal/desconto/total dos pedidos antigos que ainda não têm os totais gravados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Pedidos por lote.")
+
+    def handle(self, *args, **options):
+        total = backfill_order_totals(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ Totais preenchidos em {total} pedidos."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders.cep import CEP_INDEX_PATH, build_cep_index
+
+
+class Command(BaseCommand):
+    help = "Compila orders/data/cep_ranges.csv no índice binário usado para resolver CEP -> UF."
+
+    def handle(self, *args, **options):
+        total = build_cep_index()
+        self.stdout.write(self.style.SUCCESS(f"✅ Índice de CEP gerado em {CEP_INDEX_PATH}: {total} faixas."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from orders.totals import check_order_totals
+
+
+class Command(BaseCommand):
+    help = "Recalcula os totais de todos os pedidos a partir dos itens e lista as divergências."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Pedidos por lote.")
+        parser.add_argument('--fix', action='store_true', help="Grava o valor recalculado nos pedidos divergentes.")
+
+    def handle(self, *args, **options):
+        mismatches = check_order_totals(batch_size=options['batch_size'], fix=options['fix'])
+        for order_id, stored, expected in mismatches:
+            self.stdout.write(f"❌ Pedido {order_id}: gravado {stored}, correto {expected}")
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("✅ Todos os totais conferem."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"✅ {len(mismatches)} pedidos corrigidos."))
+        else:
+            self.stdout.write(self.style.WARNING(f"⚠️ {len(mismatches)} pedidos divergentes (use --fix para corrigir)."))
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from orders.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Exporta pedidos com itens, cupom, UTM e frete para CSV ou XLSX (streaming, memória constante)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Arquivo de saída ('-' para a saída padrão).")
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--start', help="Pedidos criados a partir de (AAAA-MM-DD).")
+        parser.add_argument('--end', help="Pedidos criados até (AAAA-MM-DD).")
+        parser.add_argument('--kind', choices=[choice for choice, _ in Order.KIND_CHOICES])
+        parser.add_argument('--paid', action='store_true', help="Só pedidos pagos.")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = Order.objects.order_by('id')
+        try:
+            if options['start']:
+                queryset = queryset.filter(created__date__gte=parse_date(options['start']))
+            if options['end']:
+                queryset = queryset.filter(created__date__lte=parse_date(options['end']))
+        except (TypeError, ValueError):
+            raise CommandError("Use datas no formato AAAA-MM-DD.")
+        if options['kind']:
+            queryset = queryset.filter(kind=options['kind'])
+        if options['paid']:
+            queryset = queryset.filter(paid=True)
+
+        stream, _ = EXPORT_FORMATS[options['format']]
+        to_stdout = options['output'] == '-'
+        output = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        try:
+            for chunk in stream(queryset, options['chunk_size']):
+                output.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        finally:
+            if not to_stdout:
+                output.close()
+
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(f"✅ Pedidos exportados para {options['output']}."))
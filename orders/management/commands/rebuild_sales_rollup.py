@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from orders.models import Order
+from orders.rollup import rebuild_sales_rollup
+
+
+class Command(BaseCommand):
+    help = "Recalcula o resumo diário de vendas (Dashboard) a partir dos pedidos pagos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Primeiro dia (AAAA-MM-DD). Padrão: desde o início.")
+        parser.add_argument('--end', help="Último dia (AAAA-MM-DD). Padrão: até hoje.")
+
+    def handle(self, *args, **options):
+        start = self.parse_day(options['start'])
+        end = self.parse_day(options['end'])
+
+        if Order.objects.filter(paid=True, total__isnull=True).exists():
+            self.stdout.write(self.style.WARNING(
+                "⚠️ Há pedidos pagos sem total gravado: rode backfill_order_totals antes para não subestimar o faturamento."
+            ))
+
+        total = rebuild_sales_rollup(start=start, end=end)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resumo de vendas reconstruído: {total} linhas."))
+
+    def parse_day(self, value):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError as e:
+            raise CommandError(f"Data inválida: {value} ({e})")
+        if day is None:
+            # parse_date devolve None quando o texto nem tem o formato AAAA-MM-DD
+            raise CommandError(f"Data inválida: {value} (use AAAA-MM-DD)")
+        return day
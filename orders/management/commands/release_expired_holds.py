@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.reservations import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Devolve ao estoque as reservas de pedidos não pagos que já expiraram (rodar via cron a cada poucos minutos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Reservas liberadas por transação.")
+
+    def handle(self, *args, **options):
+        total = release_expired_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} reservas expiradas devolvidas ao estoque."))
@@ -0,0 +1,49 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from orders.webhooks import process_webhook_events, replay_webhook_events
+
+
+def _parse_moment(value, end=False):
+    """Aceita AAAA-MM-DD (dia inteiro) ou AAAA-MM-DD HH:MM."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.max if end else time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = "Devolve para a fila os eventos do webhook do Asaas recebidos numa janela de tempo (reprocessamento seguro)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Início (AAAA-MM-DD ou AAAA-MM-DD HH:MM).")
+        parser.add_argument('--end', help="Fim (AAAA-MM-DD ou AAAA-MM-DD HH:MM).")
+        parser.add_argument('--event', help="Só este evento (ex.: PAYMENT_RECEIVED).")
+        parser.add_argument('--now', action='store_true', help="Processa aqui mesmo em vez de esperar o worker.")
+
+    def handle(self, *args, **options):
+        if not options['start'] and not options['end']:
+            raise CommandError("Informe --start e/ou --end.")
+        try:
+            start = _parse_moment(options['start']) if options['start'] else None
+            end = _parse_moment(options['end'], end=True) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f"Data inválida: {e}")
+
+        total = replay_webhook_events(start=start, end=end, event=options['event'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} eventos devolvidos para a fila."))
+
+        if options['now']:
+            processed = 0
+            while True:
+                done = process_webhook_events()
+                if not done:
+                    break
+                processed += done
+            self.stdout.write(self.style.SUCCESS(f"✅ {processed} eventos processados."))
@@ -0,0 +1,43 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications.sender import send_queued_emails
+from orders.outbox import process_payment_jobs
+from orders.webhooks import process_webhook_events
+
+
+class Command(BaseCommand):
+    help = "Worker das filas locais: cobranças (PaymentJob), eventos do webhook do Asaas (WebhookEvent) e e-mails (OutgoingEmail)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Processa o que estiver vencido e sai (útil em cron).")
+        parser.add_argument('--interval', type=float, default=2.0, help="Segundos de espera quando a fila está vazia.")
+        parser.add_argument('--batch-size', type=int, default=10, help="Cobranças reservadas por ciclo (eventos do webhook e e-mails: 5x isso).")
+
+    def handle(self, *args, **options):
+        self.running = True
+        # SIGTERM (deploy/restart do dyno): termina o lote atual e sai sem deixar job pela metade
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        total = 0
+        while self.running:
+            close_old_connections()
+            done = process_webhook_events(limit=options['batch_size'] * 5)
+            done += process_payment_jobs(limit=options['batch_size'])
+            done += send_queued_emails(limit=options['batch_size'] * 5)
+            total += done
+            if options['once']:
+                if done:
+                    continue
+                break
+            if not done:
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Worker encerrado: {total} tarefas processadas."))
+
+    def stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 13:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0018_alter_shippingrate_delivery_cost_and_more'),
+        ('products', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('held', 'Reservado'), ('committed', 'Confirmado'), ('released', 'Liberado')], default='held', max_length=10, verbose_name='Status')),
+                ('expires_at', models.DateTimeField(verbose_name='Expira em')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='orders.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Estoque',
+                'verbose_name_plural': 'Reservas de Estoque',
+                'indexes': [models.Index(condition=models.Q(('status', 'held')), fields=['expires_at'], name='reservation_held_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0020_order_discount_amount_order_subtotal_order_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Dia')),
+                ('channel', models.CharField(choices=[('wine', 'Vinhos'), ('course', 'Cursos')], max_length=10, verbose_name='Canal')),
+                ('coupon_code', models.CharField(blank=True, default='', max_length=50, verbose_name='Cupom')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Pedidos')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Subtotal')),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Descontos')),
+                ('shipping', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Frete')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Faturamento')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Vendas',
+                'verbose_name_plural': 'Resumos Diários de Vendas',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'channel', 'coupon_code'), name='unique_sales_rollup')],
+            },
+        ),
+    ]
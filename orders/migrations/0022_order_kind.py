@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-18 13:29
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_course_orders(apps, schema_editor):
+    """Pedidos antigos com curso nos itens viram kind='course' (um único UPDATE)."""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    has_course = Exists(OrderItem.objects.filter(order=OuterRef('pk'), course__isnull=False))
+    Order.objects.filter(has_course).update(kind='course')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0021_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='kind',
+            field=models.CharField(choices=[('wine', 'Vinhos'), ('course', 'Cursos')], db_index=True, default='wine', max_length=10, verbose_name='Tipo'),
+        ),
+        migrations.RunPython(mark_course_orders, migrations.RunPython.noop),
+    ]
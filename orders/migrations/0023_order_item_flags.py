@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 13:30
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def classify_orders(apps, schema_editor):
+    """Preenche has_physical_items/has_courses dos pedidos existentes (um único UPDATE)."""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk'))
+    Order.objects.update(
+        has_physical_items=Exists(items.filter(product__isnull=False)),
+        has_courses=Exists(items.filter(course__isnull=False)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0001_initial'),
+        ('orders', '0022_order_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='has_courses',
+            field=models.BooleanField(default=False, verbose_name='Tem cursos'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='has_physical_items',
+            field=models.BooleanField(default=False, verbose_name='Tem produtos físicos'),
+        ),
+        migrations.RunPython(classify_orders, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='kind',
+            field=models.CharField(choices=[('wine', 'Vinhos'), ('course', 'Cursos')], default='wine', max_length=10, verbose_name='Tipo'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['kind', 'paid', '-created'], name='order_kind_paid_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('has_physical_items', True)), fields=['paid', '-created'], name='order_physical_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('has_courses', True)), fields=['paid', '-created'], name='order_courses_idx'),
+        ),
+    ]
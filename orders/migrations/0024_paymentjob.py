@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 13:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0023_order_item_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('billing_type', models.CharField(default='UNDEFINED', max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Na fila'), ('running', 'Processando'), ('done', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último erro')),
+                ('asaas_payment_id', models.CharField(blank=True, default='', max_length=50, verbose_name='ID da cobrança')),
+                ('invoice_url', models.URLField(blank=True, default='', max_length=500, verbose_name='Link de pagamento')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_jobs', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'Cobrança na Fila',
+                'verbose_name_plural': 'Cobranças na Fila',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='paymentjob_pending_idx')],
+            },
+        ),
+    ]
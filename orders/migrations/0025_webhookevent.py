@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0024_paymentjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_id', models.CharField(max_length=50, verbose_name='ID da cobrança')),
+                ('event', models.CharField(max_length=50, verbose_name='Evento')),
+                ('external_reference', models.CharField(blank=True, default='', max_length=50, verbose_name='Referência')),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Na fila'), ('done', 'Processado'), ('failed', 'Falhou')], default='pending', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último erro')),
+                ('received_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Recebido em')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Processado em')),
+            ],
+            options={
+                'verbose_name': 'Evento do Webhook',
+                'verbose_name_plural': 'Eventos do Webhook',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['received_at'], name='webhookevent_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('payment_id', 'event'), name='unique_webhook_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 14:10
+
+from django.db import migrations
+from django.db.models import Case, Exists, OuterRef, Value, When
+
+
+def derive_kind(apps, schema_editor):
+    """Recalcula kind pelos itens, como Order.update_item_flags (um único UPDATE)."""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk'))
+    physical = Exists(items.filter(product__isnull=False))
+    courses = Exists(items.filter(course__isnull=False))
+    Order.objects.update(kind=Case(When(courses & ~physical, then=Value('course')), default=Value('wine')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0025_webhookevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(derive_kind, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 14:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0026_order_kind_from_items'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_kind_paid_created_idx',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 14:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0027_remove_order_kind_paid_created_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='webhookevent',
+            name='webhookevent_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa'),
+        ),
+        migrations.AddIndex(
+            model_name='webhookevent',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='webhookevent_due_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-18 14:13
+
+from django.db import migrations
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def seed_rollup(apps, schema_editor):
+    """Monta o resumo diário com os pedidos pagos existentes (como rollup.rebuild_sales_rollup)."""
+    Order = apps.get_model('orders', 'Order')
+    DailySalesRollup = apps.get_model('orders', 'DailySalesRollup')
+    rows = (Order.objects.filter(paid=True)
+            .annotate(day=TruncDate('created'), coupon_key=Coalesce('coupon__code', Value('')))
+            .values('day', 'kind', 'coupon_key')
+            .annotate(orders_count=Count('id'),
+                      sum_subtotal=Sum('subtotal'),
+                      sum_discount=Sum('discount_amount'),
+                      sum_shipping=Sum('shipping_cost'),
+                      sum_total=Sum('total'))
+            .order_by())
+
+    DailySalesRollup.objects.all().delete()
+    DailySalesRollup.objects.bulk_create([
+        DailySalesRollup(
+            day=row['day'], channel=row['kind'], coupon_code=row['coupon_key'],
+            orders_count=row['orders_count'],
+            subtotal=row['sum_subtotal'] or 0,
+            discount_amount=row['sum_discount'] or 0,
+            shipping=row['sum_shipping'] or 0,
+            total=row['sum_total'] or 0,
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0001_initial'),
+        ('orders', '0028_webhookevent_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_rollup, migrations.RunPython.noop),
+    ]
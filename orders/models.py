@@ -1,9 +1,11 @@
 from django.db import models
+from django.db.models import Case, Exists, OuterRef, Value, When
 from django.core.validators import MinLengthValidator
 from products.models import Product
 from decimal import Decimal
 from coupons.models import Coupon
 from datetime import timedelta
+from django.utils import timezone
 from courses.models import Course
 
 
@@ -13,6 +15,17 @@ class Order(models.Model):
         ('sedex', 'SEDEX'),
         ('delivery', 'Transportadora'),
     ]
+    KIND_CHOICES = [
+        ('wine', 'Vinhos'),
+        ('course', 'Cursos'),
+    ]
+    # Canal de venda (relatórios/rollup, export): 'course' só quando todos os itens são cursos.
+    # Derivado dos itens junto com as flags abaixo (ver update_item_flags)
+    kind = models.CharField('Tipo', max_length=10, choices=KIND_CHOICES, default='wine')
+    # Classificação pelos itens, mantida no checkout e no Admin (ver update_item_flags)
+    has_physical_items = models.BooleanField('Tem produtos físicos', default=False)
+    has_courses = models.BooleanField('Tem cursos', default=False)
+
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     email = models.EmailField()
@@ -71,39 +84,79 @@ class Order(models.Model):
                                on_delete=models.SET_NULL)
     discount = models.IntegerField(default=0)
 
+    # Totais gravados no checkout (ver orders/totals.py); None = pedido antigo ainda sem backfill
+    subtotal = models.DecimalField('Subtotal', max_digits=10, decimal_places=2, null=True, blank=True)
+    discount_amount = models.DecimalField('Desconto (R$)', max_digits=10, decimal_places=2, null=True, blank=True)
+    total = models.DecimalField('Total', max_digits=10, decimal_places=2, null=True, blank=True)
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            # Listas do Admin (🛒 Vinhos / 🎓 Cursos): só as linhas de cada tipo, já na ordem da tela
+            models.Index(fields=['paid', '-created'], name='order_physical_idx',
+                         condition=models.Q(has_physical_items=True)),
+            models.Index(fields=['paid', '-created'], name='order_courses_idx',
+                         condition=models.Q(has_courses=True)),
+        ]
 
     def __str__(self):
         return f'Pedido {self.id}'
 
+    def update_item_flags(self):
+        """Recalcula has_physical_items/has_courses/kind a partir dos itens (um único UPDATE)."""
+        items = OrderItem.objects.filter(order=OuterRef('pk'))
+        physical = Exists(items.filter(product__isnull=False))
+        courses = Exists(items.filter(course__isnull=False))
+        Order.objects.filter(pk=self.pk).update(
+            has_physical_items=physical,
+            has_courses=courses,
+            kind=Case(When(courses & ~physical, then=Value('course')), default=Value('wine')),
+        )
+        self.refresh_from_db(fields=['has_physical_items', 'has_courses', 'kind'])
+
     def get_total_cost(self):
+        # Total gravado no checkout: sem percorrer os itens
+        if self.total is not None:
+            return self.total
         total_items = sum(item.get_cost() for item in self.items.all())
         # Aplica o desconto se houver
         discount_amount = total_items * (Decimal(self.discount) / Decimal(100))
         return (total_items - discount_amount) + Decimal(self.shipping_cost)
 
+    def set_totals(self, subtotal):
+        """Preenche subtotal/desconto/total a partir da soma dos itens (não salva)."""
+        from .totals import compute_totals  # Import local: totals.py importa este módulo
+        self.subtotal, self.discount_amount, self.total = compute_totals(subtotal, self.discount, self.shipping_cost)
+
+    def refresh_totals(self):
+        """Recalcula os totais a partir dos itens do banco e grava só esses campos."""
+        self.set_totals(sum((item.get_cost() for item in self.items.all()), Decimal('0')))
+        self.save(update_fields=['subtotal', 'discount_amount', 'total'])
+
     @property
     def estimated_delivery_date(self):
         """Calcula a entrega somente se o pedido estiver pago"""
         if not self.paid:
             return None  # Não exibe data se não houver confirmação de pagamento
 
-        try:
-            rate = ShippingRate.objects.get(state__iexact=self.state)
+        from .shipping import get_rate  # Import local: shipping.py importa este módulo
+        rate = get_rate(self.state)
+        if rate is None:
+            return None
 
-            days = 0
-            if self.shipping_method == 'sedex':
-                days = rate.sedex_days
-            elif self.shipping_method == 'delivery':
-                days = rate.delivery_days
-            else:
-                days = rate.pac_days
+        days = 0
+        if self.shipping_method == 'sedex':
+            days = rate.sedex_days
+        elif self.shipping_method == 'delivery':
+            days = rate.delivery_days
+        else:
+            days = rate.pac_days
 
-            # A contagem começa a partir da última atualização (confirmação do Webhook)
-            return self.updated + timedelta(days=days) if self.paid else None
-        except ShippingRate.DoesNotExist:
-            return None
+        if days is None:
+            return None  # Modalidade sem prazo cadastrado para o estado
+
+        # A contagem começa a partir da última atualização (confirmação do Webhook)
+        return self.updated + timedelta(days=days) if self.paid else None
 
 
 class OrderItem(models.Model):
@@ -177,4 +230,135 @@ class OrderCourse(Order):
     class Meta:
         proxy = True
         verbose_name = 'Inscrição de Curso'
-        verbose_name_plural = '🎓 Pedidos: Cursos'
\ No newline at end of file
+        verbose_name_plural = '🎓 Pedidos: Cursos'
+
+class StockReservation(models.Model):
+    """
+    Reserva temporária de estoque de um pedido (ver orders/reservations.py).
+    O estoque sai de Product.stock ao reservar; se o pagamento não chegar até
+    expires_at, o varredor devolve a quantidade ao produto.
+    """
+    STATUS_CHOICES = [
+        ('held', 'Reservado'),
+        ('committed', 'Confirmado'),
+        ('released', 'Liberado'),
+    ]
+    order = models.ForeignKey(Order, related_name='reservations', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='reservations', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField('Status', max_length=10, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField('Expira em')
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Reserva de Estoque'
+        verbose_name_plural = 'Reservas de Estoque'
+        indexes = [
+            # O varredor só olha reservas ainda presas, em ordem de expiração
+            models.Index(fields=['expires_at'], name='reservation_held_idx',
+                         condition=models.Q(status='held')),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} (Pedido {self.order_id})"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Resumo diário de vendas pagas por canal e cupom (ver orders/rollup.py).
+    Atualizado a cada pagamento confirmado; o Dashboard soma só estas linhas.
+    """
+    CHANNEL_CHOICES = [
+        ('wine', 'Vinhos'),
+        ('course', 'Cursos'),
+    ]
+    day = models.DateField('Dia')
+    channel = models.CharField('Canal', max_length=10, choices=CHANNEL_CHOICES)
+    coupon_code = models.CharField('Cupom', max_length=50, blank=True, default='')
+    orders_count = models.PositiveIntegerField('Pedidos', default=0)
+    subtotal = models.DecimalField('Subtotal', max_digits=12, decimal_places=2, default=0)
+    discount_amount = models.DecimalField('Descontos', max_digits=12, decimal_places=2, default=0)
+    shipping = models.DecimalField('Frete', max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField('Faturamento', max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Resumo Diário de Vendas'
+        verbose_name_plural = 'Resumos Diários de Vendas'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'channel', 'coupon_code'], name='unique_sales_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.channel} {self.coupon_code or '-'}"
+
+
+class PaymentJob(models.Model):
+    """
+    Outbox de cobranças (ver orders/outbox.py): gravado na mesma transação do
+    pedido e executado pelo worker (python manage.py run_worker), fora da requisição.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Na fila'),
+        ('running', 'Processando'),
+        ('done', 'Concluído'),
+        ('failed', 'Falhou'),
+    ]
+    order = models.ForeignKey(Order, related_name='payment_jobs', on_delete=models.CASCADE)
+    billing_type = models.CharField(max_length=20, default='UNDEFINED')
+    status = models.CharField('Status', max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('Tentativas', default=0)
+    next_attempt_at = models.DateTimeField('Próxima tentativa', default=timezone.now)
+    last_error = models.TextField('Último erro', blank=True, default='')
+    asaas_payment_id = models.CharField('ID da cobrança', max_length=50, blank=True, default='')
+    invoice_url = models.URLField('Link de pagamento', max_length=500, blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Cobrança na Fila'
+        verbose_name_plural = 'Cobranças na Fila'
+        indexes = [
+            # O worker só procura jobs na fila, pela ordem de vencimento
+            models.Index(fields=['next_attempt_at'], name='paymentjob_pending_idx',
+                         condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f"Cobrança do Pedido {self.order_id} ({self.status})"
+
+
+class WebhookEvent(models.Model):
+    """
+    Evento bruto recebido do Asaas (ver orders/webhooks.py). A chave única
+    (payment_id, event) descarta reenvios já na gravação; o worker processa a fila.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Na fila'),
+        ('done', 'Processado'),
+        ('failed', 'Falhou'),
+    ]
+    payment_id = models.CharField('ID da cobrança', max_length=50)
+    event = models.CharField('Evento', max_length=50)
+    external_reference = models.CharField('Referência', max_length=50, blank=True, default='')
+    payload = models.JSONField()
+    status = models.CharField('Status', max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField('Tentativas', default=0)
+    last_error = models.TextField('Último erro', blank=True, default='')
+    received_at = models.DateTimeField('Recebido em', auto_now_add=True, db_index=True)
+    next_attempt_at = models.DateTimeField('Próxima tentativa', default=timezone.now)
+    processed_at = models.DateTimeField('Processado em', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Evento do Webhook'
+        verbose_name_plural = 'Eventos do Webhook'
+        constraints = [
+            models.UniqueConstraint(fields=['payment_id', 'event'], name='unique_webhook_event'),
+        ]
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='webhookevent_due_idx',
+                         condition=models.Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.payment_id} ({self.status})"
@@ -0,0 +1,133 @@
+"""
+Outbox de cobranças: o checkout não chama o Asaas dentro da requisição.
+
+  1. place_order / finalize_course_order gravam o pedido e um PaymentJob na
+     mesma transação (ou os dois existem, ou nenhum).
+  2. O worker (python manage.py run_worker) pega os jobs vencidos com
+     SELECT ... FOR UPDATE SKIP LOCKED, cria a cobrança e guarda o invoiceUrl.
+     Falhas temporárias voltam para a fila com backoff exponencial + jitter.
+  3. A página de confirmação consulta orders:payment_status até o link aparecer.
+     Os links da cobrança levam um token assinado do pedido (payment_url), então
+     funcionam em outro aparelho ou depois do login, sem depender da sessão.
+
+Sem broker externo: a fila é a própria tabela.
+"""
+import random
+from datetime import timedelta
+
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from financial.payment_events import order_reference
+from .gateway_service import AsaasGateway
+from .models import PaymentJob
+
+PAYMENT_JOB_MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 15 * 60
+# Job 'running' sem atualização há mais que isso = worker morreu no meio: volta para a fila
+STALE_AFTER = timedelta(minutes=5)
+PAYMENT_TOKEN_SALT = 'orders.payment'
+
+
+class PermanentPaymentError(Exception):
+    """O Asaas recusou a cobrança (dados inválidos): repetir não adianta."""
+
+
+def enqueue_payment(order, billing_type='UNDEFINED'):
+    """Coloca a cobrança do pedido na fila. Chamar dentro da transação que cria o pedido."""
+    return PaymentJob.objects.create(order=order, billing_type=billing_type)
+
+
+def payment_token(order_id):
+    """Assinatura do id do pedido (HMAC com a SECRET_KEY): quem tem o link acompanha a cobrança."""
+    return signing.Signer(salt=PAYMENT_TOKEN_SALT).signature(str(order_id))
+
+
+def check_payment_token(order_id, token):
+    return bool(token) and constant_time_compare(token, payment_token(order_id))
+
+
+def payment_url(order_id, name='orders:process_payment'):
+    """URL assinada da página de pagamento (ou do status, name='orders:payment_status')."""
+    return f"{reverse(name, args=[order_id])}?t={payment_token(order_id)}"
+
+
+def retry_delay(attempts):
+    """Espera antes da próxima tentativa: 10s, 20s, 40s... até 15 min, com ±50% de jitter."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+def requeue_stale_jobs():
+    """Devolve para a fila jobs presos em 'running' por um worker que caiu."""
+    now = timezone.now()
+    return PaymentJob.objects.filter(status='running', updated__lt=now - STALE_AFTER).update(
+        status='pending', next_attempt_at=now, updated=now
+    )
+
+
+def claim_payment_jobs(limit=10):
+    """Reserva até `limit` jobs vencidos para este worker (outros workers pulam as linhas travadas)."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            PaymentJob.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        PaymentJob.objects.filter(id__in=ids).update(status='running', attempts=F('attempts') + 1, updated=now)
+    return list(PaymentJob.objects.select_related('order').filter(id__in=ids))
+
+
+def run_payment_job(job, gateway=None):
+    """Cria a cobrança do job e grava o resultado (concluído, nova tentativa ou falha)."""
+    gateway = gateway or AsaasGateway()
+    try:
+        payment = None
+        if job.attempts > 1 or PaymentJob.objects.filter(order_id=job.order_id).exclude(id=job.id).exists():
+            # A tentativa anterior (deste job ou de um job antigo do pedido) pode ter criado
+            # a cobrança antes de cair (timeout): não duplica
+            payment = gateway.find_payment(order_reference(job.order_id))
+        if payment is None:
+            payment = gateway.create_payment(job.order, billing_type=job.billing_type)
+        if not payment.get('invoiceUrl'):
+            raise PermanentPaymentError(payment.get('errors') or payment)
+    except PermanentPaymentError as e:
+        job.status = 'failed'
+        job.last_error = str(e)
+        print(f"❌ Cobrança do pedido {job.order_id} recusada pelo Asaas: {e}")
+    except Exception as e:
+        job.last_error = f"{e.__class__.__name__}: {e}"
+        if job.attempts >= PAYMENT_JOB_MAX_ATTEMPTS:
+            job.status = 'failed'
+            print(f"❌ Cobrança do pedido {job.order_id} falhou após {job.attempts} tentativas: {e}")
+        else:
+            job.status = 'pending'
+            job.next_attempt_at = timezone.now() + retry_delay(job.attempts)
+            print(f"⚠️ Cobrança do pedido {job.order_id} (tentativa {job.attempts}) falhou, nova tentativa em breve: {e}")
+    else:
+        job.status = 'done'
+        job.last_error = ''
+        job.asaas_payment_id = payment.get('id', '')
+        job.invoice_url = payment['invoiceUrl']
+        print(f"✅ Cobrança do pedido {job.order_id} criada: {job.invoice_url}")
+
+    job.save(update_fields=['status', 'last_error', 'next_attempt_at', 'asaas_payment_id', 'invoice_url', 'updated'])
+    return job
+
+
+def process_payment_jobs(limit=10):
+    """Um ciclo do worker. Retorna quantos jobs foram executados."""
+    requeue_stale_jobs()
+    jobs = claim_payment_jobs(limit)
+    if jobs:
+        gateway = AsaasGateway()
+        for job in jobs:
+            run_payment_job(job, gateway)
+    return len(jobs)
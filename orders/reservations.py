@@ -0,0 +1,143 @@
+"""
+Reservas de estoque com prazo para o checkout.
+
+Fluxo:
+  1. place_order -> hold_stock: tira a quantidade de Product.stock e grava uma
+     StockReservation 'held' que expira em STOCK_HOLD_MINUTES.
+  2. Webhook de pagamento -> commit_reservations: a reserva vira 'committed'
+     (o estoque já saiu, então nada muda no produto).
+  3. Varredor (manage.py release_expired_holds) -> release_expired_reservations:
+     reservas vencidas voltam para o estoque em lote.
+
+Só entram aqui produtos com Product.track_stock ligado: o estoque nunca foi
+mantido antes das reservas (o padrão é 0), então o controle é ativado produto a
+produto no admin, depois de conferir a quantidade.
+
+Nada aqui trava a tabela: a baixa é um único UPDATE condicional
+(... WHERE stock >= quantidade) e o varredor pula linhas já travadas por outro
+processo (SKIP LOCKED), então checkouts simultâneos não se bloqueiam.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+
+from products.models import Product
+from .models import StockReservation
+
+
+class _Shortage(Exception):
+    """Sinal interno para desfazer o savepoint quando falta estoque."""
+
+
+def _stock_change(quantities, sign):
+    """Expressão CASE que soma (sign=1) ou subtrai (sign=-1) a quantidade de cada produto."""
+    return Case(
+        *[When(id=product_id, then=F('stock') + sign * quantity) for product_id, quantity in quantities.items()],
+        default=F('stock'),
+        output_field=models.PositiveIntegerField(),
+    )
+
+
+def _take_stock(quantities):
+    """
+    Baixa todas as quantidades num único UPDATE condicional.
+    Retorna quantos produtos tinham estoque suficiente (e foram baixados).
+    """
+    condition = Q()
+    for product_id, quantity in quantities.items():
+        condition |= Q(id=product_id, stock__gte=quantity)
+    return Product.objects.filter(condition).update(stock=_stock_change(quantities, -1))
+
+
+def hold_stock(order, quantities, minutes=None):
+    """
+    Reserva {product_id: quantidade} para o pedido (tudo ou nada), só dos
+    produtos com track_stock ligado.
+    Levanta ValidationError com os nomes dos produtos sem estoque suficiente.
+    """
+    # Produtos sem controle de estoque passam direto (estado lido do banco, não do carrinho)
+    tracked = set(Product.objects.filter(id__in=quantities, track_stock=True).values_list('id', flat=True))
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if product_id in tracked}
+    if not quantities:
+        return []
+
+    minutes = settings.STOCK_HOLD_MINUTES if minutes is None else minutes
+    try:
+        # Savepoint: se um único produto faltar, a baixa dos outros é desfeita
+        with transaction.atomic():
+            if _take_stock(quantities) != len(quantities):
+                raise _Shortage
+    except _Shortage:
+        rows = Product.objects.filter(id__in=quantities).values_list('id', 'name', 'stock')
+        available = {product_id: (name, stock) for product_id, name, stock in rows}
+        unavailable = sorted(
+            available[product_id][0] if product_id in available else f"produto #{product_id}"
+            for product_id, quantity in quantities.items()
+            if product_id not in available or available[product_id][1] < quantity
+        )
+        raise ValidationError({'__all__': f"Estoque insuficiente para: {', '.join(unavailable)}."})
+
+    expires_at = timezone.now() + timedelta(minutes=minutes)
+    return StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items()
+    ])
+
+
+def commit_reservations(order):
+    """
+    Confirma as reservas de um pedido pago. Se o pagamento chegou depois do
+    varredor liberar a reserva, tenta retirar o estoque de novo.
+    Retorna quantas reservas foram confirmadas.
+    """
+    with transaction.atomic():
+        # Trava as reservas do pedido: espera o varredor terminar se ele estiver nelas
+        pending = list(order.reservations.select_for_update().exclude(status='committed'))
+        if not pending:
+            return 0
+
+        late = {r.product_id: r.quantity for r in pending if r.status == 'released'}
+        if late and _take_stock(late) != len(late):
+            # O pedido já foi pago: confirma mesmo assim e avisa para a equipe repor
+            print(f"⚠️ Pedido {order.id} pago após a reserva expirar e sem estoque para todos os itens.")
+
+        StockReservation.objects.filter(id__in=[r.id for r in pending]).update(status='committed')
+
+    print(f"📦 Estoque do pedido {order.id} confirmado ({len(pending)} reservas).")
+    return len(pending)
+
+
+def release_expired_reservations(batch_size=500, now=None):
+    """
+    Devolve ao estoque as reservas vencidas e não pagas, em lotes.
+    Cada lote é uma transação curta: 1 SELECT (SKIP LOCKED) + 2 UPDATEs.
+    Retorna o total de reservas liberadas.
+    """
+    now = now or timezone.now()
+    total = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(status='held', expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('id', 'product_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                break
+
+            quantities = {}
+            for _, product_id, quantity in batch:
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+            Product.objects.filter(id__in=quantities).update(stock=_stock_change(quantities, 1))
+            StockReservation.objects.filter(id__in=[row[0] for row in batch]).update(status='released')
+
+        total += len(batch)
+
+    return total
@@ -0,0 +1,149 @@
+"""
+Resumo diário de vendas (DailySalesRollup).
+
+Cada pedido pago soma uma vez na linha (dia do pedido, canal, cupom), e as
+edições no Admin aplicam só a diferença: o Dashboard do Admin lê só essas
+linhas, então carrega em tempo constante para qualquer período. Se algo sair do fluxo normal (pedido apagado, edição direta
+no banco), python manage.py rebuild_sales_rollup refaz o período a partir dos pedidos.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailySalesRollup, Order
+
+
+def rollup_entry(order):
+    """Quanto o pedido soma no resumo: (chave, valores), ou None se não está pago."""
+    if not order.paid:
+        return None
+    key = {
+        'day': timezone.localdate(order.created),
+        'channel': order.kind,
+        'coupon_code': order.coupon.code if order.coupon_id else '',
+    }
+    values = {
+        'orders_count': 1,
+        'subtotal': Decimal(order.subtotal or 0),
+        'discount_amount': Decimal(order.discount_amount or 0),
+        'shipping': Decimal(order.shipping_cost),
+        'total': Decimal(order.get_total_cost()),
+    }
+    return key, values
+
+
+def _add(key, values):
+    with transaction.atomic():
+        rollup, _ = DailySalesRollup.objects.get_or_create(**key)
+        # Incremento no próprio UPDATE: pagamentos simultâneos não se sobrescrevem
+        DailySalesRollup.objects.filter(pk=rollup.pk).update(
+            **{field: F(field) + value for field, value in values.items()}
+        )
+
+
+def _withdraw(key, values):
+    change = {field: F(field) - value for field, value in values.items()}
+    # Sem linha para retirar (resumo apagado ou editado à mão): em vez de gravar
+    # uma contagem negativa, refaz o dia a partir dos pedidos
+    if not DailySalesRollup.objects.filter(orders_count__gte=1, **key).update(**change):
+        rebuild_sales_rollup(start=key['day'], end=key['day'])
+
+
+def record_paid_order(order):
+    """Soma o pedido recém-pago no resumo do dia. Chamar uma única vez, na confirmação do pagamento."""
+    _add(*rollup_entry(order))
+
+
+def record_order_change(before, after):
+    """
+    Aplica no resumo só a diferença de uma edição do pedido (pagamento, itens,
+    frete, desconto, cupom). before/after vêm de rollup_entry: desmarcar como
+    pago um pedido que não estava contado (before=None) não retira nada.
+    """
+    if before == after:
+        return
+    if before and after and before[0] == after[0]:
+        # Mesma linha: um único UPDATE com a diferença dos totais
+        key, values = after
+        _add(key, {field: value - before[1][field] for field, value in values.items()})
+        return
+    with transaction.atomic():
+        if before:
+            _withdraw(*before)
+        if after:
+            _add(*after)
+
+
+def rebuild_sales_rollup(start=None, end=None):
+    """
+    Recalcula o resumo dos dias [start, end] (datas locais; None = sem limite) direto
+    dos pedidos pagos, com uma única query agregada. Retorna quantas linhas foram gravadas.
+    """
+    orders = Order.objects.filter(paid=True)
+    rollups = DailySalesRollup.objects.all()
+    if start:
+        orders = orders.filter(created__date__gte=start)
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        orders = orders.filter(created__date__lte=end)
+        rollups = rollups.filter(day__lte=end)
+
+    rows = (orders
+            .annotate(day=TruncDate('created'),
+                      coupon_key=Coalesce('coupon__code', Value('')))
+            .values('day', 'kind', 'coupon_key')
+            .annotate(orders_count=Count('id'),
+                      sum_subtotal=Sum('subtotal'),
+                      sum_discount=Sum('discount_amount'),
+                      sum_shipping=Sum('shipping_cost'),
+                      sum_total=Sum('total'))
+            .order_by())
+
+    with transaction.atomic():
+        rollups.delete()
+        created = DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(
+                day=row['day'], channel=row['kind'], coupon_code=row['coupon_key'],
+                orders_count=row['orders_count'],
+                subtotal=row['sum_subtotal'] or 0,
+                discount_amount=row['sum_discount'] or 0,
+                shipping=row['sum_shipping'] or 0,
+                total=row['sum_total'] or 0,
+            )
+            for row in rows
+        ])
+    return len(created)
+
+
+def default_period(days=30):
+    """Período padrão do Dashboard: os últimos `days` dias, incluindo hoje."""
+    end = timezone.localdate()
+    return end - timedelta(days=days - 1), end
+
+
+def sales_summary(start, end):
+    """Totais do período [start, end] lidos só do resumo diário."""
+    rollups = DailySalesRollup.objects.filter(day__gte=start, day__lte=end)
+    totals = rollups.aggregate(total_sales=Sum('total'), count_orders=Sum('orders_count'))
+    total_sales = totals['total_sales'] or Decimal('0')
+    count_orders = totals['count_orders'] or 0
+
+    by_channel = {row['channel']: row for row in
+                  rollups.values('channel').annotate(revenue=Sum('total'), orders=Sum('orders_count')).order_by()}
+    top_coupons = (rollups.exclude(coupon_code='')
+                   .values('coupon_code')
+                   .annotate(orders=Sum('orders_count'), revenue=Sum('total'))
+                   .order_by('-orders')[:5])
+
+    return {
+        'total_sales': total_sales,
+        'count_orders': count_orders,
+        'avg_ticket': total_sales / count_orders if count_orders else 0,
+        'wine_sales': by_channel.get('wine', {}).get('revenue') or 0,
+        'course_sales': by_channel.get('course', {}).get('revenue') or 0,
+        'top_coupons': top_coupons,
+    }
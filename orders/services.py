@@ -1,14 +1,109 @@
-from .models import ShippingRate
+from .models import Order, OrderItem
+from coupons.models import Coupon
+from .outbox import enqueue_payment
+from .reservations import hold_stock
+from .shipping import get_rate
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from decimal import Decimal
+
 
 def calculate_shipping(state_uf):
     if not state_uf:
         return 0
-    try:
-        # Busca a UF enviada pelo BuscaCEP (ex: 'SP')
-        rate = ShippingRate.objects.get(state__iexact=state_uf)
-        # Retorna o custo da transportadora ou PAC
-        return rate.delivery_cost
-    except ShippingRate.DoesNotExist:
+    # Busca a UF enviada pelo BuscaCEP (ex: 'SP')
+    rate = get_rate(state_uf)
+    if rate is None:
         # Lança erro para estados não cadastrados na sua planilha
-        raise ValidationError(f"Infelizmente não temos logística para {state_uf} ainda.")
\ No newline at end of file
+        raise ValidationError(f"Infelizmente não temos logística para {state_uf} ainda.")
+    # Retorna o custo da transportadora ou PAC
+    return rate.delivery_cost
+
+
+def select_shipping(rate, selected_method):
+    """
+    Escolhe (método, custo) do frete para a modalidade pedida pelo cliente.
+    Só aceita uma modalidade se o valor existir (is not None) na tabela.
+    """
+    # Caso 1: Escolheu SEDEX e SEDEX existe para esse estado
+    if selected_method == 'sedex' and rate.sedex_cost is not None:
+        return 'sedex', rate.sedex_cost
+
+    # Caso 2: Escolheu Transportadora e ela existe
+    if selected_method == 'delivery' and rate.delivery_cost is not None:
+        return 'delivery', rate.delivery_cost
+
+    # Caso 3: Escolheu PAC (ou fallback padrão) e PAC existe
+    if rate.pac_cost is not None:
+        return 'pac', rate.pac_cost
+
+    # Caso 4 (Emergência): Se PAC for None (ex: estado só tem Sedex), pega o que tiver
+    if rate.sedex_cost is not None:
+        return 'sedex', rate.sedex_cost
+    if rate.delivery_cost is not None:
+        return 'delivery', rate.delivery_cost
+
+    # Valores padrão (Safety First)
+    return 'pac', 0
+
+
+def place_order(order, cart, coupon_id=None, shipping_method=None):
+    """
+    Grava o pedido do carrinho numa única transação, com número constante de queries:
+    pedido + itens (bulk_create) + reserva de estoque + uso do cupom (UPDATE com F())
+    + cobrança na fila (PaymentJob).
+
+    Levanta ValidationError ({'campo': mensagem}) se o estado não tiver
+    logística ou se algum produto não tiver estoque suficiente.
+    """
+    lines = list(cart)
+
+    # --- 1. LÓGICA DE CUPOM ---
+    coupon = None
+    if coupon_id:
+        now = timezone.now()
+        coupon = Coupon.objects.filter(id=coupon_id, active=True,
+                                       valid_from__lte=now, valid_to__gte=now).first()
+    order.coupon = coupon
+    order.discount = coupon.discount if coupon else 0
+
+    # --- 2. LÓGICA DE FRETE ---
+    state_uf = order.state.strip().upper()
+    rate = get_rate(state_uf)
+    if rate is None:
+        raise ValidationError({'state': f"Logística indisponível para {state_uf}."})
+    order.state = state_uf
+    order.shipping_method, order.shipping_cost = select_shipping(rate, shipping_method)
+
+    # O carrinho só vende produtos físicos
+    order.has_physical_items = True
+    order.kind = 'wine'
+
+    # Totais gravados junto com o pedido (relatórios somam direto no SQL)
+    order.set_totals(sum((line['price'] * line['quantity'] for line in lines), Decimal('0')))
+
+    # --- 3. SALVAMENTO FINAL (tudo ou nada) ---
+    quantities = {}
+    for line in lines:
+        quantities[line['product'].id] = quantities.get(line['product'].id, 0) + line['quantity']
+
+    with transaction.atomic():
+        order.save()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=line['product'], price=line['price'], quantity=line['quantity'])
+            for line in lines
+        ])
+
+        # Reserva o estoque por STOCK_HOLD_MINUTES (UPDATE condicional, sem travar linhas antes)
+        hold_stock(order, quantities)
+
+        if coupon:
+            # Incremento atômico: checkouts simultâneos não perdem usos do cupom
+            Coupon.objects.filter(id=coupon.id).update(usage_count=F('usage_count') + 1)
+
+        # Cobrança vai para a fila na mesma transação; o worker chama o Asaas fora da requisição
+        enqueue_payment(order)
+
+    return order
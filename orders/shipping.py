@@ -0,0 +1,94 @@
+"""
+Tabela de fretes em memória.
+
+A ShippingRate tem no máximo 27 linhas (uma por UF), então cada processo carrega
+a tabela inteira uma vez num mapa imutável {UF: Rate}. Cotação, checkout e prazo
+de entrega leem desse mapa sem tocar no banco.
+
+A mesma carga gera um digest do conteúdo, usado como ETag da cotação de frete
+(orders.views.get_shipping_quote): enquanto a tabela não mudar, navegador e CDN
+reaproveitam a resposta.
+
+Invalidação: cada processo relê a tabela do banco a cada SHIPPING_RATES_TTL
+segundos, então uma alteração feita em outro container aparece em no máximo um
+TTL (sem depender de cache compartilhado). Salvar/apagar uma ShippingRate
+(signals em orders/signals.py) recarrega na hora o processo que fez a alteração.
+"""
+import hashlib
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from .models import ShippingRate
+
+SHIPPING_RATES_TTL = 60  # Segundos até cada processo reler a tabela do banco
+SHIPPING_QUOTE_MAX_AGE = 60 * 10  # Segundos que navegador/CDN guardam a cotação
+
+RATE_FIELDS = ['state', 'pac_cost', 'pac_days', 'sedex_cost', 'sedex_days', 'delivery_cost', 'delivery_days']
+Rate = namedtuple('Rate', RATE_FIELDS)
+
+_lock = threading.Lock()
+_loaded = (None, MappingProxyType({}), '')  # (carregado em (monotonic), {UF: Rate}, digest)
+
+
+def _expired(loaded_at):
+    return loaded_at is None or time.monotonic() - loaded_at >= SHIPPING_RATES_TTL
+
+
+def _load_rates():
+    """Mapa atual (relido do banco depois do TTL) e o digest do seu conteúdo."""
+    global _loaded
+    if _expired(_loaded[0]):
+        with _lock:
+            if _expired(_loaded[0]):
+                rates = {row[0].upper(): Rate(row[0].upper(), *row[1:])
+                         for row in ShippingRate.objects.values_list(*RATE_FIELDS)}
+                digest = hashlib.sha1(repr(sorted(rates.items())).encode()).hexdigest()[:16]
+                _loaded = (time.monotonic(), MappingProxyType(rates), digest)
+    return _loaded[1], _loaded[2]
+
+
+def get_shipping_rates():
+    """
+    Mapa somente leitura {UF: Rate}, relido do banco a cada SHIPPING_RATES_TTL
+    segundos (ou logo depois de salvar uma ShippingRate neste processo).
+    """
+    return _load_rates()[0]
+
+
+def shipping_rates_etag():
+    """Digest do conteúdo da tabela: igual em todos os workers/containers depois que todos relerem a tabela."""
+    return _load_rates()[1]
+
+
+def get_rate(state_uf):
+    """Frete da UF (sem diferenciar maiúsculas) ou None se o estado não for atendido."""
+    return get_shipping_rates().get((state_uf or '').strip().upper())
+
+
+def invalidate_shipping_rates():
+    """Faz este processo reler a tabela na próxima consulta (os outros releem pelo TTL)."""
+    global _loaded
+    with _lock:
+        _loaded = (None,) + _loaded[1:]
+
+
+def shipping_options(rate):
+    """Modalidades de envio disponíveis (só as com preço e prazo cadastrados)."""
+    options = []
+
+    # Só adiciona PAC se tiver preço e prazo cadastrados
+    if rate.pac_cost is not None and rate.pac_days is not None:
+        options.append({'id': 'pac', 'name': 'PAC', 'cost': float(rate.pac_cost), 'days': rate.pac_days})
+
+    # Só adiciona SEDEX se tiver preço e prazo
+    if rate.sedex_cost is not None and rate.sedex_days is not None:
+        options.append({'id': 'sedex', 'name': 'SEDEX', 'cost': float(rate.sedex_cost), 'days': rate.sedex_days})
+
+    # Só adiciona Transportadora se tiver preço e prazo
+    if rate.delivery_cost is not None and rate.delivery_days is not None:
+        options.append({'id': 'delivery', 'name': 'Transportadora',
+                        'cost': float(rate.delivery_cost), 'days': rate.delivery_days})
+
+    return options
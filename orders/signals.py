@@ -0,0 +1,13 @@
+# orders/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ShippingRate
+from .shipping import invalidate_shipping_rates
+
+
+@receiver([post_save, post_delete], sender=ShippingRate)
+def shipping_rates_changed(sender, **kwargs):
+    # Só depois do commit: senão o processo pode recarregar a tabela antiga
+    transaction.on_commit(invalidate_shipping_rates)
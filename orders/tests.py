@@ -1,3 +1,175 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Course
+from products.models import Category, Product
+from .models import DailySalesRollup, Order, OrderItem, WebhookEvent
+from .rollup import record_order_change, record_paid_order, rollup_entry
+from .webhooks import WEBHOOK_MAX_ATTEMPTS, process_event, process_webhook_events, record_event
+
+
+def asaas_payload(event='PAYMENT_RECEIVED', payment_id='pay_1', reference='order:1'):
+    return {'event': event, 'payment': {'id': payment_id, 'externalReference': reference}}
+
+
+class RecordEventTests(TestCase):
+    def test_redelivery_is_stored_once(self):
+        self.assertTrue(record_event(asaas_payload()))
+        self.assertTrue(record_event(asaas_payload()))
+        self.assertTrue(record_event(asaas_payload(event='PAYMENT_CONFIRMED')))
+
+        self.assertEqual(WebhookEvent.objects.filter(payment_id='pay_1', event='PAYMENT_RECEIVED').count(), 1)
+        self.assertEqual(WebhookEvent.objects.count(), 2)
+
+    def test_payload_without_payment_is_ignored(self):
+        for data in (
+            [],
+            'PAYMENT_RECEIVED',
+            {'event': 'PAYMENT_RECEIVED'},
+            {'event': 'PAYMENT_RECEIVED', 'payment': 'pay_1'},
+            {'event': 'PAYMENT_RECEIVED', 'payment': ['pay_1']},
+            {'event': 'PAYMENT_RECEIVED', 'payment': {'externalReference': 'order:1'}},
+            {'payment': {'id': 'pay_1'}},
+        ):
+            with self.subTest(data=data):
+                self.assertFalse(record_event(data))
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    @override_settings(ASAAS_WEBHOOK_TOKEN='segredo')
+    def test_webhook_view_only_records(self):
+        url = reverse('orders:asaas_webhook')
+        body = json.dumps(asaas_payload())
+
+        response = self.client.post(url, body, content_type='application/json', HTTP_ASAAS_ACCESS_TOKEN='errado')
+        self.assertEqual(response.status_code, 401)
+
+        with mock.patch('orders.webhooks.process_payment_event') as process:
+            response = self.client.post(url, body, content_type='application/json', HTTP_ASAAS_ACCESS_TOKEN='segredo')
+        self.assertEqual(response.json(), {'status': 'received'})
+        process.assert_not_called()
+        self.assertEqual(WebhookEvent.objects.get().status, 'pending')
+
+        response = self.client.post(url, json.dumps({'event': 'X', 'payment': 'pay_1'}),
+                                    content_type='application/json', HTTP_ASAAS_ACCESS_TOKEN='segredo')
+        self.assertEqual(response.json(), {'status': 'ignored'})
+
+
+class ProcessEventTests(TestCase):
+    def setUp(self):
+        record_event(asaas_payload())
+        self.event = WebhookEvent.objects.get()
+
+    def test_success_marks_event_done(self):
+        with mock.patch('orders.webhooks.process_payment_event', return_value='order_processed') as process:
+            self.assertTrue(process_event(self.event.id))
+
+        process.assert_called_once_with('PAYMENT_RECEIVED', {'id': 'pay_1', 'externalReference': 'order:1'})
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.status, self.event.attempts, self.event.last_error), ('done', 1, ''))
+        self.assertIsNotNone(self.event.processed_at)
+
+        # Já processado: não aplica de novo
+        with mock.patch('orders.webhooks.process_payment_event') as process:
+            self.assertFalse(process_event(self.event.id))
+        process.assert_not_called()
+
+    def test_failure_retries_then_gives_up(self):
+        with mock.patch('orders.webhooks.process_payment_event', side_effect=RuntimeError('Asaas fora')):
+            self.assertTrue(process_event(self.event.id))
+            self.event.refresh_from_db()
+            self.assertEqual((self.event.status, self.event.attempts), ('pending', 1))
+            self.assertEqual(self.event.last_error, 'RuntimeError: Asaas fora')
+            self.assertIsNone(self.event.processed_at)
+
+            for _ in range(WEBHOOK_MAX_ATTEMPTS - 1):
+                process_event(self.event.id)
+
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.status, self.event.attempts), ('failed', WEBHOOK_MAX_ATTEMPTS))
+        self.assertFalse(process_event(self.event.id))
+
+    def test_failed_attempt_waits_for_backoff(self):
+        with mock.patch('orders.webhooks.process_payment_event', side_effect=RuntimeError('Asaas fora')) as process:
+            self.assertEqual(process_webhook_events(), 1)
+            self.event.refresh_from_db()
+            self.assertGreater(self.event.next_attempt_at, timezone.now())
+
+            # Ainda no backoff: o worker não pega o evento de novo
+            self.assertEqual(process_webhook_events(), 0)
+        self.assertEqual(process.call_count, 1)
+
+        WebhookEvent.objects.filter(id=self.event.id).update(next_attempt_at=timezone.now())
+        with mock.patch('orders.webhooks.process_payment_event', return_value='order_processed'):
+            self.assertEqual(process_webhook_events(), 1)
+        self.event.refresh_from_db()
+        self.assertEqual((self.event.status, self.event.attempts), ('done', 2))
+
+
+class ItemFlagsTests(TestCase):
+    def test_kind_follows_items(self):
+        order = Order.objects.create(
+            first_name='Ana', last_name='Silva', email='ana@x.com', phone='(11) 98888-7777',
+            address='Rua A', number='1', postal_code='01001000', city='São Paulo', state='SP',
+        )
+        course = Course.objects.create(title='Sommelier', price=100)
+        wine = Product.objects.create(category=Category.objects.create(name='Tintos'), name='Malbec',
+                                      description='Tinto', price='50.00', image='products/x.jpg')
+        OrderItem.objects.create(order=order, course=course, product=None, price=100, quantity=1)
+        order.update_item_flags()
+        self.assertEqual((order.kind, order.has_courses, order.has_physical_items), ('course', True, False))
+
+        # Pedido misto vai para o canal de vinhos (tem frete)
+        item = OrderItem.objects.create(order=order, product=wine, price='50.00', quantity=1)
+        order.update_item_flags()
+        self.assertEqual((order.kind, order.has_courses, order.has_physical_items), ('wine', True, True))
+
+        item.delete()
+        order.update_item_flags()
+        self.assertEqual(Order.objects.get(pk=order.pk).kind, 'course')
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            first_name='Ana', last_name='Silva', email='ana@x.com', phone='(11) 98888-7777',
+            address='Rua A', number='1', postal_code='01001000', city='São Paulo', state='SP',
+            shipping_cost='20.00', subtotal='100.00', discount_amount='0.00', total='120.00', paid=True,
+        )
+
+    def totals(self):
+        return list(DailySalesRollup.objects.values_list('channel', 'orders_count', 'total'))
+
+    def test_edit_of_paid_order_applies_the_difference(self):
+        record_paid_order(self.order)
+        before = rollup_entry(self.order)
+        self.order.shipping_cost = '35.00'
+        self.order.set_totals(self.order.subtotal)
+        self.order.save()
+        record_order_change(before, rollup_entry(self.order))
+        self.assertEqual(self.totals(), [('wine', 1, 135)])
+
+        # Virou pedido de curso: sai de um canal e entra no outro
+        before = rollup_entry(self.order)
+        self.order.kind = 'course'
+        record_order_change(before, rollup_entry(self.order))
+        self.assertEqual(sorted(self.totals()), [('course', 1, 135), ('wine', 0, 0)])
+
+    def test_unpay_is_idempotent(self):
+        record_paid_order(self.order)
+        before = rollup_entry(self.order)
+        self.order.paid = False
+        record_order_change(before, rollup_entry(self.order))
+        # Salvo de novo como não pago: nada a retirar
+        record_order_change(rollup_entry(self.order), rollup_entry(self.order))
+        self.assertEqual(self.totals(), [('wine', 0, 0)])
+
+    def test_unpay_without_rollup_row_rebuilds_the_day(self):
+        before = rollup_entry(self.order)
+        Order.objects.filter(pk=self.order.pk).update(paid=False)
+        self.order.paid = False
+        record_order_change(before, rollup_entry(self.order))
+        self.assertEqual(self.totals(), [])
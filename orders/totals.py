@@ -0,0 +1,84 @@
+"""
+Totais desnormalizados do pedido (Order.subtotal / discount_amount / total).
+
+O checkout grava os totais uma vez, dentro da mesma transação do pedido, e
+relatórios somam a coluna `total` direto no SQL. Para pedidos antigos (ou
+editados fora do fluxo) existem duas rotinas em lote:
+  - backfill_order_totals: preenche quem ainda está com total vazio;
+  - check_order_totals: recalcula a partir dos itens e aponta (ou corrige) divergências.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import F, Sum
+
+from .models import Order, OrderItem
+
+CENT = Decimal('0.01')
+
+
+def compute_totals(subtotal, discount_percent, shipping_cost):
+    """(subtotal, valor do desconto, total) com a mesma regra de Order.get_total_cost, em centavos."""
+    subtotal = Decimal(subtotal).quantize(CENT, ROUND_HALF_UP)
+    discount_amount = (subtotal * Decimal(discount_percent or 0) / Decimal(100)).quantize(CENT, ROUND_HALF_UP)
+    total = (subtotal - discount_amount + Decimal(shipping_cost or 0)).quantize(CENT, ROUND_HALF_UP)
+    return subtotal, discount_amount, total
+
+
+def _item_subtotals(order_ids):
+    """{order_id: soma de price * quantity} em uma única query agregada."""
+    rows = (OrderItem.objects.filter(order_id__in=order_ids)
+            .values('order_id')
+            .annotate(subtotal=Sum(F('price') * F('quantity')))
+            .values_list('order_id', 'subtotal'))
+    return dict(rows)
+
+
+def _batches(queryset, batch_size):
+    """Percorre o queryset em lotes por id (keyset), sem OFFSET."""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def _recompute(batch):
+    """Recalcula os totais do lote em memória; devolve os pedidos cujo valor mudou."""
+    subtotals = _item_subtotals([order.id for order in batch])
+    changed = []
+    for order in batch:
+        current = (order.subtotal, order.discount_amount, order.total)
+        order.set_totals(subtotals.get(order.id) or Decimal('0'))
+        if (order.subtotal, order.discount_amount, order.total) != current:
+            changed.append(order)
+    return changed
+
+
+def backfill_order_totals(batch_size=500):
+    """Preenche os totais dos pedidos que ainda não têm. Retorna quantos foram gravados."""
+    queryset = Order.objects.filter(total__isnull=True).only('id', 'discount', 'shipping_cost',
+                                                              'subtotal', 'discount_amount', 'total')
+    updated = 0
+    for batch in _batches(queryset, batch_size):
+        _recompute(batch)
+        Order.objects.bulk_update(batch, ['subtotal', 'discount_amount', 'total'])
+        updated += len(batch)
+    return updated
+
+
+def check_order_totals(batch_size=500, fix=False):
+    """
+    Confere todos os pedidos contra a soma dos itens.
+    Retorna a lista de (id, total gravado, total correto); com fix=True já grava o valor correto.
+    """
+    queryset = Order.objects.only('id', 'discount', 'shipping_cost', 'subtotal', 'discount_amount', 'total')
+    mismatches = []
+    for batch in _batches(queryset, batch_size):
+        stored = {order.id: order.total for order in batch}
+        changed = _recompute(batch)
+        mismatches.extend((order.id, stored[order.id], order.total) for order in changed)
+        if fix and changed:
+            Order.objects.bulk_update(changed, ['subtotal', 'discount_amount', 'total'])
+    return mismatches
@@ -12,6 +12,7 @@ urlpatterns = [
     path('coupons/apply/', views.apply_coupon, name='apply_coupon'),
 
     path('process-payment/<int:order_id>/', views.process_payment, name='process_payment'),
+    path('process-payment/<int:order_id>/status/', views.payment_status, name='payment_status'),
     path('finalizar-curso/<int:course_id>/', views.finalize_course_order, name='finalize_course_order'),
 
     path('fale-conosco/', views.fale_conosco, name='fale_conosco'),
@@ -1,25 +1,29 @@
 from django.shortcuts import render, redirect
-from django.core.mail import send_mail
-from django.contrib.auth.models import User
 from django.contrib import messages
 from django.core.exceptions import ValidationError
-from .models import OrderItem, Order, ShippingRate
+from .models import OrderItem, Order
 from .forms import OrderCreateForm
-from financial.models import Enrollment
 from products.cart import Cart
-from .services import calculate_shipping
+from .services import calculate_shipping, place_order
+from .cep import resolve_uf
+from .shipping import (SHIPPING_QUOTE_MAX_AGE, get_rate, get_shipping_rates, shipping_options,
+                       shipping_rates_etag)
 from django.http import JsonResponse
-from .gateway_service import AsaasGateway
+from .outbox import check_payment_token, enqueue_payment, payment_token, payment_url
+from .webhooks import record_event
 from coupons.models import Coupon
 from django.utils import timezone
 
 from django.shortcuts import get_object_or_404, redirect
 from django.conf import settings
+from django.db import transaction
 import requests
 
 from django.contrib.auth import login
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition, require_safe
+from django.http import Http404, HttpResponse
 from django.contrib.auth.decorators import login_required
 import json
 
@@ -33,153 +37,79 @@ def order_create(request):
 
     if request.method == 'POST':
         if form.is_valid():
-            order = form.save(commit=False)
-
-            # --- 1. LÓGICA DE CUPOM ---
-            coupon_id = request.session.get('coupon_id')
-            if coupon_id:
-                try:
-                    coupon = Coupon.objects.get(id=coupon_id, active=True,
-                                                valid_from__lte=timezone.now(),
-                                                valid_to__gte=timezone.now())
-                    order.coupon = coupon
-                    order.discount = coupon.discount
-                    coupon.usage_count += 1
-                    coupon.save()
-                except Coupon.DoesNotExist:
-                    order.coupon = None
-                    order.discount = 0
-                    request.session['coupon_id'] = None
-            # --- 2. LÓGICA DE FRETE (AGORA FORA DO BLOCO DO CUPOM) ---
-            state_uf = form.cleaned_data.get('state').strip().upper()
-            selected_method = request.POST.get('shipping_method')
-
             try:
-                from .models import ShippingRate
-                rate = ShippingRate.objects.get(state__iexact=state_uf)
-
-                # Valores padrão (Safety First)
-                order.shipping_method = 'pac'
-                order.shipping_cost = 0
-
-                # Lógica de Prioridade: Só aceita se o valor existir (is not None) no banco
-
-                # Caso 1: Escolheu SEDEX e SEDEX existe para esse estado
-                if selected_method == 'sedex' and rate.sedex_cost is not None:
-                    order.shipping_cost = rate.sedex_cost
-                    order.shipping_method = 'sedex'
-
-                # Caso 2: Escolheu Transportadora e ela existe
-                elif selected_method == 'delivery' and rate.delivery_cost is not None:
-                    order.shipping_cost = rate.delivery_cost
-                    order.shipping_method = 'delivery'
-
-                # Caso 3: Escolheu PAC (ou fallback padrão) e PAC existe
-                elif rate.pac_cost is not None:
-                    order.shipping_cost = rate.pac_cost
-                    order.shipping_method = 'pac'
-
-                # Caso 4 (Emergência): Se PAC for None (ex: estado só tem Sedex), pega o que tiver
-                else:
-                    if rate.sedex_cost is not None:
-                        order.shipping_cost = rate.sedex_cost
-                        order.shipping_method = 'sedex'
-                    elif rate.delivery_cost is not None:
-                        order.shipping_cost = rate.delivery_cost
-                        order.shipping_method = 'delivery'
-
-            except ShippingRate.DoesNotExist:
-                form.add_error('state', f"Logística indisponível para {state_uf}.")
-                return render(request, 'orders/create.html', {'cart': cart, 'form': form})
-
-            # --- 3. SALVAMENTO FINAL ---
-            order.state = state_uf
-            order.save()
-
-            for item in cart:
-                OrderItem.objects.create(
-                    order=order,
-                    product=item['product'],
-                    price=item['price'],
-                    quantity=item['quantity']
+                order = place_order(
+                    form.save(commit=False),
+                    cart,
+                    coupon_id=request.session.get('coupon_id'),
+                    shipping_method=request.POST.get('shipping_method')
                 )
+            except ValidationError as e:
+                form.add_error(None, e)
+                return render(request, 'orders/create.html', {'cart': cart, 'form': form})
 
             # --- 4. PAGAMENTO ASAAS ---
-            try:
-                gateway = AsaasGateway()
-                payment_response = gateway.create_payment(order, billing_type='UNDEFINED')
-                payment_url = payment_response.get('invoiceUrl')
-            except Exception as e:
-                # Se der erro no Asaas, não quebramos o site, mas logamos
-                print(f"Erro ao gerar pagamento Asaas: {e}")
-                payment_url = None  # Ou redirecionar para página de erro
-
+            # A cobrança já está na fila (PaymentJob); a página consulta o status até o link sair
             cart.clear()
             request.session['coupon_id'] = None
 
-            return render(request, 'orders/created.html', {
-                'order': order,
-                'payment_url': payment_url
-            })
+            return render(request, 'orders/created.html', {'order': order, 'payment_token': payment_token(order.id)})
         else:
             print(f"ERROS DO FORMULÁRIO: {form.errors}")
 
     return render(request, 'orders/create.html', {'cart': cart, 'form': form})
 
 
+@require_safe
+@cache_control(public=True, max_age=SHIPPING_QUOTE_MAX_AGE)
+@condition(etag_func=lambda request: shipping_rates_etag())
 def get_shipping_quote(request):
-    state_uf = request.GET.get('city', '').strip().upper()
-    try:
-        from .models import ShippingRate
-        rate = ShippingRate.objects.get(state__iexact=state_uf)
-
-        # Cria a lista de opções dinamicamente
-        options = []
-
-        # Só adiciona PAC se tiver preço e prazo cadastrados
-        if rate.pac_cost is not None and rate.pac_days is not None:
-            options.append({
-                'id': 'pac',
-                'name': 'PAC',
-                'cost': float(rate.pac_cost),
-                'days': rate.pac_days
-            })
-
-        # Só adiciona SEDEX se tiver preço e prazo
-        if rate.sedex_cost is not None and rate.sedex_days is not None:
-            options.append({
-                'id': 'sedex',
-                'name': 'SEDEX',
-                'cost': float(rate.sedex_cost),
-                'days': rate.sedex_days
-            })
-
-        # Só adiciona Transportadora se tiver preço e prazo
-        if rate.delivery_cost is not None and rate.delivery_days is not None:
-            options.append({
-                'id': 'delivery',
-                'name': 'Transportadora',
-                'cost': float(rate.delivery_cost),
-                'days': rate.delivery_days
-            })
-
-        # Se não sobrou nenhuma opção válida (ex: cadastrou o estado mas deixou tudo em branco)
-        if not options:
-            return JsonResponse({'success': False, 'message': 'Nenhuma modalidade de envio disponível para este Estado.'})
-
-        return JsonResponse({
-            'success': True,
-            'options': options
-        })
-
-    except ShippingRate.DoesNotExist:
+    """
+    Cotação de frete por UF (?city=SP), por CEP (?cep=01310100) ou de todas as UFs atendidas (?all=1).
+    A resposta depende só da tabela de fretes: o ETag é o digest dela, então
+    consultas repetidas voltam 304 ou nem chegam ao Django (Cache-Control público).
+    """
+    if request.GET.get('all'):
+        # Modo em lote: o checkout baixa tudo de uma vez e cota sem novas requisições
+        rates = {}
+        for uf, rate in get_shipping_rates().items():
+            options = shipping_options(rate)
+            if options:
+                rates[uf] = options
+        return JsonResponse({'success': True, 'rates': rates})
+
+    cep = request.GET.get('cep')
+    if cep:
+        # CEP direto: a UF sai do índice local de faixas, sem depender do ViaCEP
+        state_uf = resolve_uf(cep)
+        if state_uf is None:
+            return JsonResponse({'success': False, 'message': 'CEP inválido.'})
+    else:
+        state_uf = request.GET.get('city', '').strip().upper()
+
+    rate = get_rate(state_uf)  # Tabela em memória: nenhuma query por cotação
+    if rate is None:
         return JsonResponse({'success': False, 'message': 'Região não atendida.'})
 
+    # Cria a lista de opções dinamicamente
+    options = shipping_options(rate)
+
+    # Se não sobrou nenhuma opção válida (ex: cadastrou o estado mas deixou tudo em branco)
+    if not options:
+        return JsonResponse({'success': False, 'message': 'Nenhuma modalidade de envio disponível para este Estado.'})
+
+    return JsonResponse({
+        'success': True,
+        'state': state_uf,
+        'options': options
+    })
+
 
 @csrf_exempt
 def asaas_webhook(request):
     """
-    Webhook Híbrido: Aceita pagamentos via Order (Carrinho) e via Enrollment (Checkout Direto)
+    Webhook Híbrido: Aceita pagamentos via Order (Carrinho) e via Enrollment (Checkout Direto).
+    Só grava o evento e responde; o processamento é do worker (orders/webhooks.py).
     """
     if request.method == 'POST':
         token_recebido = request.headers.get('asaas-access-token')
@@ -188,74 +118,12 @@ def asaas_webhook(request):
 
         try:
             data = json.loads(request.body)
-            event = data.get('event')
-            payment = data.get('payment', {})
-            external_ref = payment.get('externalReference')
-
-            CONFIRMATION_EVENTS = ['PAYMENT_RECEIVED', 'PAYMENT_CONFIRMED']
-
-            if event in CONFIRMATION_EVENTS and external_ref:
-
-                # --- TENTATIVA 1: Tenta achar como ORDER ---
-                try:
-                    order = Order.objects.get(id=external_ref)
-
-                    # Atualiza Status do Pedido
-                    if not order.paid:
-                        order.paid = True
-                        order.status = 'paid'  # Certifique-se que 'paid' existe no seu STATUS_CHOICES ou use 'processing'/'shipped'
-                        order.save()
-                        print(f"✅ Webhook: Pedido {order.id} processado como ORDER.")
-
-                    # Libera cursos vinculados à Order
-                    try:
-                        # Busca usuário pelo e-mail do pedido (mais seguro que order.user)
-                        student_user = User.objects.get(email=order.email)
-
-                        # AQUI ESTÁ O PULO DO GATO:
-                        # Como seu model tem related_name='items', usamos .items.all()
-                        for item in order.items.all():
-                            if item.course:
-                                enrollment, created = Enrollment.objects.get_or_create(
-                                    student=student_user,
-                                    course=item.course,
-                                    defaults={'status': 'paid'}
-                                )
-                                if not created or enrollment.status != 'paid':
-                                    enrollment.status = 'paid'
-                                    enrollment.save()
-                                print(f"🎓 Curso '{item.course.title}' liberado para {student_user.email}")
-
-                    except User.DoesNotExist:
-                        print(f"⚠️ Usuário com email {order.email} não encontrado.")
-
-                    return JsonResponse({'status': 'order_processed'})
-
-                except (Order.DoesNotExist, ValueError):
-                    # --- TENTATIVA 2: Enrollment (Legado) ---
-                    try:
-                        enrollment = Enrollment.objects.get(id=external_ref)
-                        if enrollment.status != 'paid':
-                            enrollment.status = 'paid'
-                            enrollment.save()
-
-                            send_mail(
-                                f'Acesso Liberado: {enrollment.course.title}',
-                                'Seu pagamento foi confirmado.',
-                                settings.DEFAULT_FROM_EMAIL,
-                                [enrollment.student.email],
-                                fail_silently=True
-                            )
-                        return JsonResponse({'status': 'enrollment_processed'})
-                    except (Enrollment.DoesNotExist, ValueError):
-                        print(f"❌ ERRO: Referência {external_ref} não encontrada.")
-
-            return JsonResponse({'status': 'received'})
-
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
+
+        if not isinstance(data, dict) or not record_event(data):
+            return JsonResponse({'status': 'ignored'})
+        return JsonResponse({'status': 'received'})
 
     return JsonResponse({'error': 'Method not allowed'}, status=405)
 
@@ -344,33 +212,51 @@ def my_orders(request):
 
 # orders/views.py
 
-def process_payment(request, order_id):
-    # Busca o pedido 22 que acabamos de criar
+def _payment_order_or_404(request, order_id):
+    """
+    Pedido da cobrança: vale o token assinado do link (payment_url) ou o login
+    do cliente com o mesmo e-mail do pedido.
+    """
     order = get_object_or_404(Order, id=order_id)
-    print(f"--- PROCESSANDO PAGAMENTO ASAAS PARA PEDIDO: {order.id} ---")
+    if check_payment_token(order.id, request.GET.get('t')):
+        return order
+    user = request.user
+    if user.is_authenticated and user.email and user.email.strip().lower() == (order.email or '').strip().lower():
+        return order
+    raise Http404
 
-    try:
-        # O AsaasGateway já tem a lógica de criar o cliente se ele não existir
-        gateway = AsaasGateway()
 
-        # Chamamos o método que gera a cobrança
-        payment_response = gateway.create_payment(order)
+def process_payment(request, order_id):
+    order = _payment_order_or_404(request, order_id)
+    job = order.payment_jobs.order_by('-id').first()
 
-        if 'invoiceUrl' in payment_response:
-            print(f"✅ Sucesso Asaas! URL Gerada: {payment_response.get('invoiceUrl')}")
-            # Redireciona o aluno para a página oficial de pagamento do Asaas
-            return redirect(payment_response.get('invoiceUrl'))
-        else:
-            print(f"❌ ERRO RETORNADO PELO ASAAS: {payment_response}")
-            messages.error(request, f"Erro no gateway: {payment_response.get('errors', 'Dados inválidos')}")
+    if request.method == 'POST':
+        # Nova cobrança só por ação explícita do cliente (botão da página), nunca num GET
+        if job is None or job.status == 'failed':
+            # Pedido antigo (antes da fila) ou cobrança recusada: tenta de novo pelo worker
+            enqueue_payment(order)
+        return redirect(payment_url(order.id))
 
-    except Exception as e:
-        print(f"❌ EXCEÇÃO NO PROCESSAMENTO: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        messages.error(request, "Falha na comunicação com o sistema de pagamentos.")
+    if job and job.status == 'done':
+        # Redireciona o aluno para a página oficial de pagamento do Asaas
+        return redirect(job.invoice_url)
 
-    return redirect('courses:course_list')
+    return render(request, 'orders/created.html', {'order': order, 'payment_token': payment_token(order.id)})
+
+
+@require_safe
+@never_cache
+def payment_status(request, order_id):
+    """Status da cobrança do pedido, consultado pela página de confirmação (sem chamar o Asaas)."""
+    order = _payment_order_or_404(request, order_id)
+    job = order.payment_jobs.order_by('-id').first()
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'Nenhuma cobrança para este pedido.'}, status=404)
+
+    data = {'success': True, 'status': job.status, 'payment_url': job.invoice_url or None}
+    if job.status == 'failed':
+        data['message'] = 'Não foi possível gerar a cobrança. Fale com a gente pelo WhatsApp.'
+    return JsonResponse(data)
 
 
 # orders/views.py
@@ -388,30 +274,38 @@ def finalize_course_order(request, course_id):
             f_name = name_parts[0]
             l_name = name_parts[1] if len(name_parts) > 1 else 'Sobrenome'
 
-            # REMOVIDO 'user=request.user' pois o campo não existe no seu models.py
-            order = Order.objects.create(
-                first_name=f_name,
-                last_name=l_name,
-                email=request.user.email,  # Identificamos o comprador pelo e-mail
-                phone=request.POST.get('phone'),
-                address="Acesso Digital",
-                postal_code="00000000",
-                city="Digital",
-                state="SP",
-                shipping_cost=0.00,
-                paid=False
-            )
-            print(f"✅ Pedido {order.id} criado com sucesso.")
-
-            OrderItem.objects.create(
-                order=order,
-                course=course,
-                product=None,
-                price=course.price,
-                quantity=1
-            )
-
-            return redirect('orders:process_payment', order_id=order.id)
+            # Pedido, item e cobrança na fila numa transação só
+            with transaction.atomic():
+                # REMOVIDO 'user=request.user' pois o campo não existe no seu models.py
+                order = Order.objects.create(
+                    kind='course',
+                    has_courses=True,
+                    first_name=f_name,
+                    last_name=l_name,
+                    email=request.user.email,  # Identificamos o comprador pelo e-mail
+                    phone=request.POST.get('phone'),
+                    address="Acesso Digital",
+                    postal_code="00000000",
+                    city="Digital",
+                    state="SP",
+                    shipping_cost=0.00,
+                    subtotal=course.price,
+                    discount_amount=0,
+                    total=course.price,
+                    paid=False
+                )
+                print(f"✅ Pedido {order.id} criado com sucesso.")
+
+                OrderItem.objects.create(
+                    order=order,
+                    course=course,
+                    product=None,
+                    price=course.price,
+                    quantity=1
+                )
+                enqueue_payment(order)
+
+            return redirect(payment_url(order.id))
 
         except Exception as e:
             print(f"❌ ERRO CRÍTICO NO POST: {str(e)}")
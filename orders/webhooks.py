@@ -0,0 +1,104 @@
+"""
+Ingestão dos webhooks do Asaas.
+
+  1. A view só valida o token e grava o evento bruto (WebhookEvent): um INSERT,
+     e reenvios do mesmo (payment.id, event) são descartados pela chave única.
+  2. O worker (python manage.py run_worker) processa a fila em lotes. Cada
+     evento é aplicado na mesma transação que o marca como processado, então
+     o efeito acontece uma vez só mesmo com vários workers ou reentregas.
+     Falhas voltam para a fila com backoff exponencial + jitter (next_attempt_at).
+     O que cada evento faz fica em financial/payment_events.py.
+  3. python manage.py replay_webhook_events devolve uma janela de eventos para
+     a fila; os efeitos são idempotentes (pagamento registrado por UPDATE condicional).
+"""
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from financial.payment_events import process_payment_event
+from .models import WebhookEvent
+
+WEBHOOK_MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 15 * 60
+
+
+def record_event(data):
+    """Grava o evento bruto na fila. Retorna False se o payload não tem cobrança/evento."""
+    if not isinstance(data, dict) or not isinstance(data.get('payment'), dict):
+        return False
+    payment = data['payment']
+    payment_id, event = payment.get('id'), data.get('event')
+    if not payment_id or not event:
+        return False
+
+    # INSERT ... ON CONFLICT DO NOTHING: o reenvio do Asaas não custa nem um SELECT
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(
+            payment_id=str(payment_id)[:50],
+            event=str(event)[:50],
+            external_reference=str(payment.get('externalReference') or '')[:50],
+            payload=data,
+        )
+    ], ignore_conflicts=True)
+    return True
+
+
+def retry_delay(attempts):
+    """Espera antes da próxima tentativa: 10s, 20s, 40s... até 15 min, com ±50% de jitter."""
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+def process_event(event_id):
+    """Processa um evento da fila. Retorna False se outro worker já o pegou."""
+    try:
+        with transaction.atomic():
+            event = (
+                WebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(id=event_id, status='pending').first()
+            )
+            if event is None:
+                return False
+            process_payment_event(event.event, event.payload.get('payment') or {})
+            event.status = 'done'
+            event.attempts += 1
+            event.last_error = ''
+            event.processed_at = timezone.now()
+            event.save(update_fields=['status', 'attempts', 'last_error', 'processed_at'])
+    except Exception as e:
+        # Nada do evento foi aplicado (rollback): conta a tentativa, espera e desiste depois do limite
+        attempts = WebhookEvent.objects.filter(id=event_id).values_list('attempts', flat=True).first() or 0
+        WebhookEvent.objects.filter(id=event_id).update(
+            attempts=F('attempts') + 1,
+            last_error=f"{e.__class__.__name__}: {e}",
+            status=Case(When(attempts__gte=WEBHOOK_MAX_ATTEMPTS - 1, then=Value('failed')), default=Value('pending')),
+            next_attempt_at=timezone.now() + retry_delay(attempts + 1),
+        )
+        print(f"❌ Webhook: falha ao processar o evento {event_id}: {e}")
+    return True
+
+
+def process_webhook_events(limit=50):
+    """Um ciclo do worker: processa até `limit` eventos vencidos na ordem de chegada. Retorna quantos pegou."""
+    event_ids = list(
+        WebhookEvent.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+        .order_by('received_at').values_list('id', flat=True)[:limit]
+    )
+    return sum(process_event(event_id) for event_id in event_ids)
+
+
+def replay_webhook_events(start=None, end=None, event=None):
+    """Devolve para a fila os eventos recebidos na janela [start, end]. Retorna quantos."""
+    queryset = WebhookEvent.objects.all()
+    if start:
+        queryset = queryset.filter(received_at__gte=start)
+    if end:
+        queryset = queryset.filter(received_at__lte=end)
+    if event:
+        queryset = queryset.filter(event=event)
+    return queryset.update(status='pending', attempts=0, last_error='', processed_at=None,
+                           next_attempt_at=timezone.now())
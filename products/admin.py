@@ -8,7 +8,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'price', 'stock', 'is_active', 'is_featured']
-    list_filter = ['is_active', 'category', 'is_featured', 'country', 'grape']
+    list_display = ['name', 'category', 'price', 'stock', 'track_stock', 'is_active', 'is_featured']
+    list_filter = ['is_active', 'track_stock', 'category', 'is_featured', 'country', 'grape']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
\ No newline at end of file
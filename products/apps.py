@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        # Registra os signals que mantêm o índice de facetas atualizado
+        from . import signals  # noqa: F401
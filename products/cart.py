@@ -1,21 +1,145 @@
 # products/cart.py
+import json
 from decimal import Decimal
 from .models import Product
 from django.conf import settings
+from django.core.cache import caches
+
+# Snapshot dos produtos do carrinho compartilhado entre requisições.
+# Fica no cache 'shared' (visível para todos os workers), então a invalidação
+# dos signals de Product (products/signals.py) vale para todos eles. O TTL curto
+# limita o atraso entre instâncias que não compartilham esse cache.
+PRODUCT_SNAPSHOT_KEY = 'products:snapshot:{}'
+PRODUCT_SNAPSHOT_TIMEOUT = 60
+
+
+def get_product_snapshots(product_ids):
+    """
+    Busca os produtos pelo id: primeiro no cache, e só os que faltarem no banco
+    (uma única query). Retorna {str(id): Product}.
+    """
+    product_ids = [str(pk) for pk in product_ids]
+    if not product_ids:
+        return {}
+
+    keys = {PRODUCT_SNAPSHOT_KEY.format(pk): pk for pk in product_ids}
+    cache = caches['shared']
+    cached = cache.get_many(keys.keys())
+    products = {keys[key]: product for key, product in cached.items()}
+
+    missing = [pk for pk in product_ids if pk not in products]
+    if missing:
+        fetched = {str(p.id): p for p in Product.objects.filter(id__in=missing)}
+        cache.set_many(
+            {PRODUCT_SNAPSHOT_KEY.format(pk): p for pk, p in fetched.items()},
+            PRODUCT_SNAPSHOT_TIMEOUT
+        )
+        products.update(fetched)
+    return products
+
+
+def invalidate_product_snapshot(product_id):
+    caches['shared'].delete(PRODUCT_SNAPSHOT_KEY.format(product_id))
+
+
+# Limite de unidades de um mesmo produto por operação da API em lote
+CART_MAX_QUANTITY = 99
+
+
+CART_LIMIT_MESSAGE = "O carrinho aceita até {limit} produtos diferentes."
+
+
+class CartError(ValueError):
+    """Operação de carrinho inválida (produto inexistente, quantidade fora do limite...)."""
+
+
+def _product_key(op):
+    """Id do produto da operação como chave do carrinho ('12'). Levanta CartError se não for um inteiro."""
+    value = op.get('product_id')
+    try:
+        if isinstance(value, (bool, float)):
+            raise TypeError
+        product_id = int(value)
+    except (TypeError, ValueError):
+        raise CartError("Produto inválido.")
+    if not 0 < product_id < 2 ** 63:
+        raise CartError("Produto inválido.")
+    return str(product_id)
+
+
+# Armazenamento em cookie assinado (settings.CART_STORAGE = 'cookie')
+CART_COOKIE_SALT = 'products.cart'
+
+
+def cart_storage():
+    # Padrão único em core/settings.py (como CART_COOKIE_NAME e CART_MAX_LINES)
+    return settings.CART_STORAGE
 
 
 class Cart:
+    """
+    Carrinho de compras: {product_id: {'quantity': int, 'price': str}}.
+
+    Fica num cookie assinado e compacto ({id: [qtd, preço]}, CART_STORAGE =
+    'cookie', o padrão), para que navegar e montar o carrinho não gere nenhuma
+    escrita no django_session, ou na sessão (CART_STORAGE = 'session'). O cookie é gravado na resposta pelo
+    CartCookieMiddleware.
+    """
+
     def __init__(self, request):
+        self.request = request
         self.session = request.session
-        cart = self.session.get('cart')
-        if not cart:
-            # Se não houver carrinho, cria um vazio na sessão
-            cart = self.session['cart'] = {}
-        self.cart = cart
+        # Memo da requisição: o context processor e a view criam Carts diferentes,
+        # mas os produtos são buscados uma vez só por requisição
+        if not hasattr(request, '_cart_products'):
+            request._cart_products = {}
+        self._products = request._cart_products
+
+        if cart_storage() == 'cookie':
+            self.cart = self._load_from_cookie()
+        else:
+            # Carrinho vazio não é gravado na sessão até o primeiro item (evita escrita a cada visita)
+            self.cart = self.session.get('cart') or {}
+
+    def _load_from_cookie(self):
+        # Todos os Carts da mesma requisição compartilham o mesmo dicionário
+        if hasattr(self.request, '_cart_data'):
+            return self.request._cart_data
+
+        cart = {}
+        raw = self.request.get_signed_cookie(
+            settings.CART_COOKIE_NAME, default=None, salt=CART_COOKIE_SALT,
+            max_age=settings.CART_COOKIE_AGE
+        )
+        if raw:
+            try:
+                cart = {
+                    str(pk): {'quantity': int(quantity), 'price': str(price)}
+                    for pk, (quantity, price) in json.loads(raw).items()
+                }
+            except (ValueError, TypeError, AttributeError):
+                cart = {}
+
+        self.request._cart_data = cart
+
+        # Migração transparente: carrinho antigo guardado na sessão vai para o cookie
+        if not cart and self.session.get('cart'):
+            cart.update(self.session['cart'])
+            del self.session['cart']
+            self.request._cart_dirty = True
+        return cart
+
+    def serialize(self):
+        """Formato compacto gravado no cookie: {"12": [2, "89.90"]}."""
+        compact = {pk: [item['quantity'], item['price']] for pk, item in self.cart.items()}
+        return json.dumps(compact, separators=(',', ':'))
 
     def add(self, product, quantity=1, override_quantity=False):
         product_id = str(product.id)
         if product_id not in self.cart:
+            if len(self.cart) >= settings.CART_MAX_LINES:
+                # Limite de itens diferentes (mantém o cookie abaixo de ~4KB)
+                return False
             self.cart[product_id] = {
                 'quantity': 0,
                 'price': str(product.price)
@@ -25,10 +149,94 @@ class Cart:
             self.cart[product_id]['quantity'] = quantity
         else:
             self.cart[product_id]['quantity'] += quantity
+        self._products[product_id] = product
         self.save()
+        return True
+
+    def apply(self, operations):
+        """
+        Aplica um lote de operações de uma vez só (tudo ou nada):
+            {'op': 'add', 'product_id': 3, 'quantity': 2}
+            {'op': 'set', 'product_id': 3, 'quantity': 5}   (0 remove o item)
+            {'op': 'remove', 'product_id': 3}
+            {'op': 'clear'}
+        Se qualquer operação for inválida, levanta CartError e o carrinho não muda.
+        """
+        product_ids = {
+            _product_key(op) for op in operations
+            if isinstance(op, dict) and op.get('op') in ('add', 'set')
+        }
+        missing = [pk for pk in product_ids if pk not in self._products]
+        if missing:
+            self._products.update(get_product_snapshots(missing))
+
+        staged = {pk: dict(item) for pk, item in self.cart.items()}
+        for op in operations:
+            if not isinstance(op, dict):
+                raise CartError("Operação inválida.")
+            action = op.get('op')
+
+            if action == 'clear':
+                staged.clear()
+                continue
+            if action not in ('add', 'set', 'remove'):
+                raise CartError(f"Operação desconhecida: {action}.")
+
+            product_id = _product_key(op)
+            if action == 'remove':
+                staged.pop(product_id, None)
+                continue
+
+            product = self._products.get(product_id)
+            if product is None or not product.is_active:
+                raise CartError(f"Produto {product_id} indisponível.")
+            quantity = op.get('quantity', 1)
+            # Só inteiros de verdade: 2.9 não vira 2 e true não vira 1 (como em _product_key)
+            if not isinstance(quantity, int) or isinstance(quantity, bool):
+                raise CartError("Quantidade inválida.")
+
+            if action == 'set' and quantity == 0:
+                staged.pop(product_id, None)
+                continue
+            if quantity < 1 or quantity > CART_MAX_QUANTITY:
+                raise CartError("Quantidade inválida.")
+
+            item = staged.setdefault(product_id, {'quantity': 0, 'price': str(product.price)})
+            item['quantity'] = quantity if action == 'set' else item['quantity'] + quantity
+            if item['quantity'] > CART_MAX_QUANTITY:
+                raise CartError(f"Máximo de {CART_MAX_QUANTITY} unidades por produto.")
+
+        if len(staged) > settings.CART_MAX_LINES:
+            raise CartError(CART_LIMIT_MESSAGE.format(limit=settings.CART_MAX_LINES))
+
+        self.cart.clear()
+        self.cart.update(staged)
+        self.save()
+
+    def summary(self):
+        """Resumo do carrinho em JSON (sem consultar o banco)."""
+        items = []
+        for product_id, item in self.cart.items():
+            price = Decimal(item['price'])
+            items.append({
+                'product_id': int(product_id),
+                'quantity': item['quantity'],
+                'price': str(price),
+                'total_price': str(price * item['quantity']),
+            })
+        return {
+            'total_items': len(self),
+            'total_price': str(self.get_total_price()),
+            'items': items,
+        }
 
     def save(self):
-        # Marca a sessão como modificada para garantir que seja salva
+        if cart_storage() == 'cookie':
+            # O CartCookieMiddleware grava o cookie na resposta
+            self.request._cart_dirty = True
+            return
+        # Grava na sessão e marca como modificada para garantir que seja salva
+        self.session['cart'] = self.cart
         self.session.modified = True
 
     def __len__(self):
@@ -38,22 +246,36 @@ class Cart:
     def get_total_price(self):
         return sum(Decimal(item['price']) * item['quantity'] for item in self.cart.values())
 
-    def __iter__(self):
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
+    def get_products(self):
+        """Produtos do carrinho: memo da requisição -> cache -> banco (no máximo 1 query)."""
+        missing = [pk for pk in self.cart if pk not in self._products]
+        if missing:
+            self._products.update(get_product_snapshots(missing))
+        return {pk: self._products[pk] for pk in self.cart if pk in self._products}
 
-        for product in products:
-            cart[str(product.id)]['product'] = product
+    def __iter__(self):
+        products = self.get_products()
 
-        for item in cart.values():
-            item['price'] = Decimal(item['price'])
-            item['total_price'] = item['price'] * item['quantity']
-            yield item
+        for product_id, data in self.cart.items():
+            product = products.get(product_id)
+            if product is None:
+                # Produto removido do catálogo depois de entrar no carrinho
+                continue
+            # Monta um item novo para não gravar objetos (Product/Decimal) dentro da sessão
+            price = Decimal(data['price'])
+            yield {
+                'product': product,
+                'quantity': data['quantity'],
+                'price': price,
+                'total_price': price * data['quantity'],
+            }
 
     def clear(self):
+        self.cart.clear()
+        if cart_storage() == 'cookie':
+            self.save()
         # Remova a sessão usando a chave exata que você definiu no __init__
         # Geralmente é 'cart'
-        if 'cart' in self.session:
+        elif 'cart' in self.session:
             del self.session['cart']
-            self.save()
\ No newline at end of file
+            self.session.modified = True
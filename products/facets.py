@@ -0,0 +1,249 @@
+# products/facets.py
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Category, FacetCount, Product
+
+# Facetas da loja: nome do parâmetro na URL -> rótulo exibido
+FACETS = {
+    'category': 'Categoria',
+    'grape': 'Uva',
+    'country': 'País',
+    'region': 'Região',
+    'vintage': 'Safra',
+    'winery': 'Vinícola',
+    'is_promotion': 'Ofertas',
+}
+
+FACET_CACHE_KEY = 'products:facet-counts'
+FACET_IDS_CACHE_KEY = 'products:facet-ids'
+FACET_CACHE_TIMEOUT = 60
+
+
+def product_facets(product):
+    """
+    Retorna as facetas de um produto como {(faceta, valor): rótulo}.
+    Produtos inativos não aparecem na loja, então não contam.
+    """
+    if product is None or not product.is_active:
+        return {}
+
+    facets = {}
+    try:
+        category_label = product.category.name
+    except Category.DoesNotExist:
+        category_label = str(product.category_id)
+    facets[('category', str(product.category_id))] = category_label
+
+    for field in ('grape', 'country', 'region', 'winery'):
+        value = (getattr(product, field) or '').strip()
+        if value:
+            facets[(field, value)] = value
+
+    if product.vintage:
+        facets[('vintage', str(product.vintage))] = str(product.vintage)
+    if product.is_promotion:
+        facets[('is_promotion', '1')] = 'Em promoção'
+    return facets
+
+
+def _bump(facet, value, label, delta):
+    updated = FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta, label=label)
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            FacetCount.objects.create(facet=facet, value=value, label=label, count=delta)
+    except IntegrityError:
+        # Outro processo criou a linha ao mesmo tempo: só incrementa
+        FacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+
+
+def apply_facet_delta(previous, current):
+    """Aplica no índice a diferença entre as facetas antigas e novas de um produto."""
+    changed = False
+    for (facet, value) in previous.keys() - current.keys():
+        _bump(facet, value, previous[(facet, value)], -1)
+        changed = True
+    for (facet, value), label in current.items():
+        if (facet, value) not in previous:
+            _bump(facet, value, label, 1)
+            changed = True
+        elif previous[(facet, value)] != label:
+            FacetCount.objects.filter(facet=facet, value=value).update(label=label)
+            changed = True
+    if changed:
+        invalidate_facet_cache()
+
+
+def invalidate_facet_cache():
+    cache.delete_many([FACET_CACHE_KEY, FACET_IDS_CACHE_KEY])
+
+
+def _facet_rows(queryset, facet):
+    """FacetCount (não salvos) de uma faceta, contando os produtos do queryset (um GROUP BY)."""
+    rows = []
+    if facet == 'category':
+        for row in queryset.values('category_id', 'category__name').annotate(total=Count('id')):
+            rows.append(FacetCount(facet='category', value=str(row['category_id']),
+                                   label=row['category__name'], count=row['total']))
+    elif facet == 'vintage':
+        for row in queryset.filter(vintage__isnull=False).values('vintage').annotate(total=Count('id')):
+            rows.append(FacetCount(facet='vintage', value=str(row['vintage']),
+                                   label=str(row['vintage']), count=row['total']))
+    elif facet == 'is_promotion':
+        promotions = queryset.filter(is_promotion=True).count()
+        if promotions:
+            rows.append(FacetCount(facet='is_promotion', value='1', label='Em promoção', count=promotions))
+    else:
+        for row in queryset.exclude(**{facet: ''}).values(facet).annotate(total=Count('id')):
+            value = row[facet].strip()
+            if value:
+                rows.append(FacetCount(facet=facet, value=value, label=value, count=row['total']))
+    return rows
+
+
+def rebuild_facet_counts():
+    """Recalcula o índice inteiro a partir do catálogo (usado pelo comando rebuild_facet_counts)."""
+    active = Product.objects.filter(is_active=True).order_by()
+    rows = []
+    for facet in FACETS:
+        rows.extend(_facet_rows(active, facet))
+
+    # Valores que diferem só por espaços nas pontas viram uma linha só
+    merged = {}
+    for row in rows:
+        key = (row.facet, row.value)
+        if key in merged:
+            merged[key].count += row.count
+        else:
+            merged[key] = row
+
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(merged.values())
+    invalidate_facet_cache()
+    return len(merged)
+
+
+def get_facet_counts():
+    """
+    Contagens de todas as facetas no catálogo inteiro (totais, sem filtros),
+    lidas do índice (uma query, com cache curto).
+    Formato: {'grape': [{'value': 'Malbec', 'label': 'Malbec', 'count': 12}, ...], ...}
+    """
+    counts = cache.get(FACET_CACHE_KEY)
+    if counts is None:
+        counts = {facet: [] for facet in FACETS}
+        rows = FacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'label', 'count')
+        for facet, value, label, count in rows:
+            if facet in counts:
+                counts[facet].append({'value': value, 'label': label, 'count': count})
+        cache.set(FACET_CACHE_KEY, counts, FACET_CACHE_TIMEOUT)
+    return counts
+
+
+def get_facet_ids():
+    """
+    Índice em memória para as contagens com filtros: {faceta: {valor: (rótulo, ids)}},
+    com os ids dos produtos ativos de cada valor. Uma query só para montar (com cache
+    curto, invalidado junto com as contagens); depois, qualquer combinação de filtros
+    é contada intersectando conjuntos, sem GROUP BY.
+    """
+    index = cache.get(FACET_IDS_CACHE_KEY)
+    if index is None:
+        ids = {facet: {} for facet in FACETS}
+        rows = Product.objects.filter(is_active=True).values_list(
+            'id', 'category_id', 'category__name', 'grape', 'country', 'region', 'winery', 'vintage', 'is_promotion'
+        )
+        for product_id, category_id, category, grape, country, region, winery, vintage, promotion in rows:
+            values = [('category', str(category_id), category)]
+            for facet, value in (('grape', grape), ('country', country), ('region', region), ('winery', winery)):
+                value = (value or '').strip()
+                if value:
+                    values.append((facet, value, value))
+            if vintage:
+                values.append(('vintage', str(vintage), str(vintage)))
+            if promotion:
+                values.append(('is_promotion', '1', 'Em promoção'))
+            for facet, value, label in values:
+                ids[facet].setdefault(value, (label, set()))[1].add(product_id)
+
+        index = {facet: {value: (label, frozenset(members)) for value, (label, members) in values.items()}
+                 for facet, values in ids.items()}
+        cache.set(FACET_IDS_CACHE_KEY, index, FACET_CACHE_TIMEOUT)
+    return index
+
+
+def _selected_ids(index, facet, values):
+    """Produtos que passam pelo filtro de uma faceta (mesma regra de filter_products)."""
+    if facet == 'is_promotion':
+        return index[facet].get('1', ('', frozenset()))[1]
+    members = set()
+    for value in values:
+        members |= index[facet].get(value, ('', frozenset()))[1]
+    return members
+
+
+def filtered_facet_counts(params, product_ids=None):
+    """
+    Contagens de acordo com a busca atual: cada faceta conta os produtos que
+    passam pelos filtros das *outras* facetas (marcar mais um valor da mesma
+    faceta soma resultados, então o número mostrado é o que o clique devolve).
+    product_ids restringe a contagem (ex.: todos os resultados da busca textual).
+    Contado em memória sobre get_facet_ids: nenhuma query além do índice.
+    """
+    index = get_facet_ids()
+    _, selected = filter_products(Product.objects.none(), params)
+    matches = {facet: _selected_ids(index, facet, values) for facet, values in selected.items()}
+
+    counts = {}
+    for facet in FACETS:
+        base = None if product_ids is None else set(product_ids)
+        for other, members in matches.items():
+            if other != facet:
+                base = set(members) if base is None else base & members
+
+        values = []
+        for value, (label, members) in index[facet].items():
+            count = len(members) if base is None else len(members & base)
+            if count:
+                values.append({'value': value, 'label': label, 'count': count})
+        values.sort(key=lambda item: (-item['count'], item['label']))
+
+        # Valor marcado que zerou continua na lista (para poder desmarcar)
+        shown = {item['value'] for item in values}
+        for value in selected.get(facet, []):
+            if value not in shown:
+                label = index[facet].get(value, (value, None))[0]
+                values.append({'value': value, 'label': label, 'count': 0})
+                shown.add(value)
+        counts[facet] = values
+    return counts
+
+
+def filter_products(queryset, params):
+    """
+    Aplica os filtros da URL ao queryset.
+    Valores da mesma faceta são combinados com OU; facetas diferentes, com E.
+    Retorna (queryset, {faceta: [valores selecionados]}).
+    """
+    selected = {}
+    for facet in FACETS:
+        values = [v.strip() for v in params.getlist(facet) if v.strip()]
+        if not values:
+            continue
+
+        if facet == 'category':
+            ids = [int(v) for v in values if v.isdigit()]
+            queryset = queryset.filter(category_id__in=ids)
+        elif facet == 'vintage':
+            years = [int(v) for v in values if v.isdigit()]
+            queryset = queryset.filter(vintage__in=years)
+        elif facet == 'is_promotion':
+            queryset = queryset.filter(is_promotion=True)
+        else:
+            queryset = queryset.filter(**{f'{facet}__in': values})
+        selected[facet] = values
+    return queryset, selected
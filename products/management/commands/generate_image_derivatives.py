@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.images import generate_derivatives
+from courses.models import Course
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Gera as miniaturas (WebP/JPEG) que faltam para as imagens de produtos e cursos."
+
+    def handle(self, *args, **options):
+        created = errors = 0
+        querysets = [
+            Product.objects.exclude(image='').only('id', 'image'),
+            Course.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image'),
+        ]
+        for queryset in querysets:
+            for obj in queryset.iterator(chunk_size=200):
+                try:
+                    created += len(generate_derivatives(obj.image))
+                except Exception as e:
+                    errors += 1
+                    self.stderr.write(f"⚠️ {obj._meta.label} {obj.pk}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {created} miniaturas geradas ({errors} erros)."))
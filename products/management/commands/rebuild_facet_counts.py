@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero o índice de contagens das facetas da loja (uva, país, safra...)."
+
+    def handle(self, *args, **options):
+        total = rebuild_facet_counts()
+        self.stdout.write(self.style.SUCCESS(f"✅ Índice de facetas reconstruído: {total} valores."))
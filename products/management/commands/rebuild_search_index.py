@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from products.models import Product
+from products.search import FTS_TABLE, build_search_document, invalidate_vocabulary
+
+
+class Command(BaseCommand):
+    help = "Recalcula os textos normalizados da busca e reconstrói o índice (FTS5 no SQLite)."
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.all())
+        for product in products:
+            product.search_title, product.search_body = build_search_document(product)
+        Product.objects.bulk_update(products, ['search_title', 'search_body'], batch_size=500)
+
+        if connection.vendor == 'sqlite':
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}(rowid, search_title, search_body) "
+                    f"SELECT id, search_title, search_body FROM products_product WHERE is_active"
+                )
+
+        invalidate_vocabulary()
+        self.stdout.write(self.style.SUCCESS(f"✅ Índice de busca reconstruído para {len(products)} produtos."))
@@ -0,0 +1,35 @@
+# products/middleware.py
+from django.conf import settings
+
+from .cart import CART_COOKIE_SALT, Cart
+
+
+class CartCookieMiddleware:
+    """
+    Grava o carrinho no cookie assinado quando ele mudou durante a requisição
+    (apenas com CART_STORAGE = 'cookie'; no modo sessão não faz nada).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if not getattr(request, '_cart_dirty', False):
+            return response
+
+        cart = Cart(request)
+        if cart.cart:
+            response.set_signed_cookie(
+                settings.CART_COOKIE_NAME,
+                cart.serialize(),
+                salt=CART_COOKIE_SALT,
+                max_age=settings.CART_COOKIE_AGE,
+                secure=request.is_secure(),
+                httponly=True,
+                samesite='Lax',
+            )
+        else:
+            response.delete_cookie(settings.CART_COOKIE_NAME, samesite='Lax')
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_image_course_is_active'),
+        ('products', '0002_product_related_course'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-is_featured', '-created_at', '-id'], name='product_home_feed_idx'),
+        ),
+    ]
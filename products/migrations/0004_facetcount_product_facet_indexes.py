@@ -0,0 +1,81 @@
+# Generated by Django 6.0 on 2026-10-18 13:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_facet_counts(apps, schema_editor):
+    """Preenche o índice de facetas com o catálogo que já existe."""
+    Product = apps.get_model('products', 'Product')
+    FacetCount = apps.get_model('products', 'FacetCount')
+    active = Product.objects.filter(is_active=True).order_by()
+    counts = {}
+
+    def add(facet, value, label, total):
+        key = (facet, value)
+        if key in counts:
+            counts[key].count += total
+        else:
+            counts[key] = FacetCount(facet=facet, value=value, label=label, count=total)
+
+    for row in active.values('category_id', 'category__name').annotate(total=Count('id')):
+        add('category', str(row['category_id']), row['category__name'], row['total'])
+    for field in ('grape', 'country', 'region', 'winery'):
+        for row in active.exclude(**{field: ''}).values(field).annotate(total=Count('id')):
+            value = row[field].strip()
+            if value:
+                add(field, value, value, row['total'])
+    for row in active.filter(vintage__isnull=False).values('vintage').annotate(total=Count('id')):
+        add('vintage', str(row['vintage']), str(row['vintage']), row['total'])
+    promotions = active.filter(is_promotion=True).count()
+    if promotions:
+        add('is_promotion', '1', 'Em promoção', promotions)
+
+    FacetCount.objects.bulk_create(counts.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_course_image_course_is_active'),
+        ('products', '0003_product_home_feed_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=30)),
+                ('value', models.CharField(max_length=255)),
+                ('label', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contagem de Faceta',
+                'verbose_name_plural': 'Contagens de Facetas',
+                'ordering': ['facet', '-count', 'label'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['grape'], name='product_grape_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['country', 'region'], name='product_country_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['vintage'], name='product_vintage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['winery'], name='product_winery_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('facet', 'value'), name='unique_facet_value'),
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
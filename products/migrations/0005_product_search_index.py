@@ -0,0 +1,114 @@
+# Generated by Django 6.0 on 2026-10-18 13:17
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópias congeladas de products/search.py no momento desta migração: mudanças
+# futuras na busca não podem alterar o que ela faz (use rebuild_search_index).
+FTS_TABLE = 'products_product_fts'
+PG_VECTOR_SQL = (
+    "(setweight(to_tsvector('simple', \"products_product\".\"search_title\"), 'A') || "
+    "setweight(to_tsvector('simple', \"products_product\".\"search_body\"), 'B'))"
+)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_PLURAL_RULES = (('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'), ('ns', 'm'))
+_SUFFIXES = (
+    'amente', 'mente', 'idades', 'idade', 'zinhos', 'zinhas', 'zinho', 'zinha',
+    'inhos', 'inhas', 'inho', 'inha', 'issimo', 'issima', 'osos', 'osas', 'oso', 'osa',
+)
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return _TOKEN_RE.findall(text)
+
+
+def stem(token):
+    if len(token) <= 3 or token.isdigit():
+        return token
+
+    for suffix, replacement in _PLURAL_RULES:
+        if token.endswith(suffix):
+            token = token[:-len(suffix)] + replacement
+            break
+    else:
+        if token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+            token = token[:-1]
+
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+
+    if len(token) > 4 and token[-1] in 'aeo':
+        token = token[:-1]
+    return token
+
+
+def analyze(text):
+    return [stem(token) for token in normalize(text)]
+
+
+def build_search_document(product):
+    title = ' '.join(analyze(f"{product.name} {product.winery}"))
+    body = ' '.join(analyze(f"{product.grape} {product.region} {product.country} {product.description}"))
+    return title, body
+
+
+def populate_search_documents(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    products = list(Product.objects.all())
+    for product in products:
+        product.search_title, product.search_body = build_search_document(product)
+    Product.objects.bulk_update(products, ['search_title', 'search_body'], batch_size=500)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS product_search_gin_idx ON products_product USING GIN ({PG_VECTOR_SQL})"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(search_title, search_body, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, search_title, search_body) "
+            f"SELECT id, search_title, search_body FROM products_product WHERE is_active"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_gin_idx")
+    elif vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_facetcount_product_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_body',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_title',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
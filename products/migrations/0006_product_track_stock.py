@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='track_stock',
+            field=models.BooleanField(default=False, verbose_name='Controlar estoque'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils.text import slugify
 from courses.models import Course
+from .search import build_search_document
 
 class Category(models.Model):
     name = models.CharField(max_length=100)
@@ -27,6 +28,8 @@ class Product(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Só produtos com controle de estoque são reservados/baixados no checkout (orders/reservations.py)
+    track_stock = models.BooleanField(default=False, verbose_name="Controlar estoque")
     image = models.ImageField(upload_to='products/')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -54,10 +57,53 @@ class Product(models.Model):
         help_text="Se este produto for um curso, selecione-o aqui para liberação automática."
     )
 
+    # Textos normalizados para a busca da loja (preenchidos no save, ver products/search.py)
+    search_title = models.TextField(blank=True, editable=False)
+    search_body = models.TextField(blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Atende a vitrine da Home (paginação por cursor só sobre produtos ativos)
+            models.Index(
+                fields=['-is_featured', '-created_at', '-id'],
+                condition=models.Q(is_active=True),
+                name='product_home_feed_idx',
+            ),
+            # Filtros da busca facetada da loja
+            models.Index(fields=['grape'], condition=models.Q(is_active=True), name='product_grape_idx'),
+            models.Index(fields=['country', 'region'], condition=models.Q(is_active=True), name='product_country_region_idx'),
+            models.Index(fields=['vintage'], condition=models.Q(is_active=True), name='product_vintage_idx'),
+            models.Index(fields=['winery'], condition=models.Q(is_active=True), name='product_winery_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        self.search_title, self.search_body = build_search_document(self)
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.name} ({self.vintage if self.vintage else 'N/A'})"
\ No newline at end of file
+        return f"{self.name} ({self.vintage if self.vintage else 'N/A'})"
+
+
+class FacetCount(models.Model):
+    """
+    Índice pré-calculado de contagens por faceta (ex: Uva = Malbec -> 12).
+    Mantido incrementalmente pelos signals de Product (ver products/signals.py),
+    assim a loja não precisa de um GROUP BY por faceta a cada requisição.
+    """
+    facet = models.CharField(max_length=30)
+    value = models.CharField(max_length=255)
+    label = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contagem de Faceta"
+        verbose_name_plural = "Contagens de Facetas"
+        ordering = ['facet', '-count', 'label']
+        constraints = [
+            models.UniqueConstraint(fields=['facet', 'value'], name='unique_facet_value'),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}: {self.label} ({self.count})"
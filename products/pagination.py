@@ -0,0 +1,75 @@
+# products/pagination.py
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+# Quantidade de vinhos por "página" da vitrine (rolagem infinita)
+HOME_PAGE_SIZE = 12
+
+# Ordem da vitrine: destaques primeiro, depois os mais novos. O 'id' desempata.
+HOME_ORDERING = ('-is_featured', '-created_at', '-id')
+
+
+def encode_cursor(product):
+    """Gera o cursor opaco que aponta para o último produto entregue."""
+    raw = json.dumps([int(product.is_featured), product.created_at.isoformat(), product.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Converte o cursor de volta em (is_featured, created_at, id).
+    Retorna None para cursores vazios ou adulterados (volta para a primeira página).
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        featured, created_at, product_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return bool(featured), datetime.fromisoformat(created_at), int(product_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def paginate_products(queryset, cursor=None, page_size=HOME_PAGE_SIZE):
+    """
+    Paginação por cursor (keyset) na ordem (-is_featured, -created_at, -id).
+
+    Em vez de OFFSET, filtramos "tudo que vem depois do último item visto",
+    então cada página custa o mesmo independente do tamanho do catálogo.
+    Retorna (lista_de_produtos, proximo_cursor_ou_None).
+    """
+    queryset = queryset.order_by(*HOME_ORDERING)
+
+    position = decode_cursor(cursor)
+    if position:
+        featured, created_at, product_id = position
+        queryset = queryset.filter(
+            Q(is_featured__lt=featured) |
+            Q(is_featured=featured, created_at__lt=created_at) |
+            Q(is_featured=featured, created_at=created_at, id__lt=product_id)
+        )
+
+    # Busca 1 item a mais só para saber se existe próxima página
+    products = list(queryset[:page_size + 1])
+    has_next = len(products) > page_size
+    products = products[:page_size]
+
+    next_cursor = encode_cursor(products[-1]) if has_next else None
+    return products, next_cursor
+
+
+def paginate_ranked(queryset, cursor=None, page_size=HOME_PAGE_SIZE):
+    """
+    Paginação dos resultados da busca textual, já ordenados por relevância.
+    A relevância não serve de chave (empates, valores float), então aqui o
+    cursor é a posição na lista ranqueada. Retorna (lista_de_produtos, proximo_cursor_ou_None).
+    """
+    # Cursor adulterado ou absurdo volta para a primeira página
+    offset = int(cursor) if cursor and cursor.isdigit() and len(cursor) <= 6 else 0
+
+    products = list(queryset[offset:offset + page_size + 1])
+    has_next = len(products) > page_size
+    return products[:page_size], str(offset + page_size) if has_next else None
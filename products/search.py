@@ -0,0 +1,263 @@
+# products/search.py
+"""
+Busca textual da loja.
+
+Os textos dos produtos são normalizados (sem acento, minúsculos) e reduzidos
+ao radical em português antes de irem para o índice, assim "Tintos", "tinta"
+e "TINTO" caem no mesmo termo. O índice em si depende do banco:
+
+- Postgres: expressão tsvector (título com peso A, corpo com peso B) + índice GIN;
+- SQLite (local): tabela virtual FTS5 sincronizada pelos signals de Product.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import BooleanField, Case, FloatField, Q, When
+from django.db.models.expressions import RawSQL
+
+# Máximo de resultados ranqueados no SQLite (FTS5, desenvolvimento local); no Postgres não há teto
+SEARCH_LIMIT = 1000
+SUGGESTION_LIMIT = 8
+SUGGESTIONS_CACHE_KEY = 'products:search-vocabulary'
+# Máximo de palavras comparadas por Levenshtein a cada tecla (autocomplete)
+FUZZY_SCAN_LIMIT = 2000
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Sufixos removidos pelo radicalizador (versão enxuta do RSLP), do mais longo para o mais curto
+_PLURAL_RULES = (('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'), ('ns', 'm'))
+_SUFFIXES = (
+    'amente', 'mente', 'idades', 'idade', 'zinhos', 'zinhas', 'zinho', 'zinha',
+    'inhos', 'inhas', 'inho', 'inha', 'issimo', 'issima', 'osos', 'osas', 'oso', 'osa',
+)
+
+# Expressão do documento no Postgres. Tem que ser idêntica à do índice GIN (migração 0005)
+PG_VECTOR_SQL = (
+    "(setweight(to_tsvector('simple', \"products_product\".\"search_title\"), 'A') || "
+    "setweight(to_tsvector('simple', \"products_product\".\"search_body\"), 'B'))"
+)
+FTS_TABLE = 'products_product_fts'
+
+
+def normalize(text):
+    """Remove acentos, converte para minúsculas e quebra em palavras."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return _TOKEN_RE.findall(text)
+
+
+def stem(token):
+    """Reduz uma palavra (já normalizada) ao radical. Palavras curtas e números ficam como estão."""
+    if len(token) <= 3 or token.isdigit():
+        return token
+
+    for suffix, replacement in _PLURAL_RULES:
+        if token.endswith(suffix):
+            token = token[:-len(suffix)] + replacement
+            break
+    else:
+        if token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+            token = token[:-1]
+
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+
+    # Gênero e vogal temática: tinto/tinta/tinte -> tint
+    if len(token) > 4 and token[-1] in 'aeo':
+        token = token[:-1]
+    return token
+
+
+def analyze(text):
+    return [stem(token) for token in normalize(text)]
+
+
+def build_search_document(product):
+    """Gera (search_title, search_body) já normalizados para o índice."""
+    title = ' '.join(analyze(f"{product.name} {product.winery}"))
+    body = ' '.join(analyze(f"{product.grape} {product.region} {product.country} {product.description}"))
+    return title, body
+
+
+def sync_search_index(product):
+    """
+    No SQLite a tabela FTS5 guarda uma cópia dos textos, então precisa ser
+    atualizada a cada save. No Postgres o índice GIN já acompanha as colunas.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    # Sem try: se o FTS falhar, o save do produto (mesma transação) falha junto e o índice não diverge
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk])
+        if product.is_active:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, search_title, search_body) VALUES (%s, %s, %s)",
+                [product.pk, product.search_title, product.search_body],
+            )
+
+
+def remove_from_search_index(product_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+
+
+def search_products(queryset, text):
+    """
+    Filtra o queryset pelos termos buscados e ordena por relevância (sem cortar:
+    a view pagina, ver pagination.paginate_ranked).
+    Todos os termos precisam aparecer (E), cada um como prefixo do radical.
+    """
+    terms = analyze(text)
+    if not terms:
+        return queryset.none()
+
+    try:
+        if connection.vendor == 'postgresql':
+            return _search_postgres(queryset, terms)
+        if connection.vendor == 'sqlite':
+            return _search_sqlite(queryset, terms)
+    except DatabaseError as e:
+        # Ex: tabela FTS quebrada. Segue com a busca simples, mas deixa rastro
+        print(f"⚠️ Busca: índice textual indisponível, usando a busca simples: {e}")
+    return _search_fallback(queryset, terms)
+
+
+def _search_postgres(queryset, terms):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    return queryset.filter(
+        RawSQL(f"{PG_VECTOR_SQL} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())
+    ).annotate(
+        rank=RawSQL(f"ts_rank({PG_VECTOR_SQL}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField())
+    ).order_by('-rank', '-is_featured', '-id')
+
+
+def _search_sqlite(queryset, terms):
+    match = ' AND '.join(f'{term}*' for term in terms)
+    page_size = 200
+    ranked, offset = [], 0
+    with connection.cursor() as cursor:
+        # Pagina o FTS até completar o limite: os filtros de facetas (no queryset)
+        # podem descartar boa parte dos mais relevantes
+        while len(ranked) < SEARCH_LIMIT:
+            # bm25: quanto menor, mais relevante. O título pesa mais que o corpo.
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, 10.0, 3.0) LIMIT %s OFFSET %s",
+                [match, page_size, offset],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            allowed = set(queryset.filter(id__in=ids).values_list('id', flat=True))
+            ranked.extend(pk for pk in ids if pk in allowed)
+            if len(ids) < page_size:
+                break
+            offset += page_size
+
+    ranked = ranked[:SEARCH_LIMIT]
+    if not ranked:
+        return queryset.none()
+    position = Case(*[When(id=pk, then=index) for index, pk in enumerate(ranked)])
+    return queryset.filter(id__in=ranked).annotate(rank=position).order_by('rank', '-id')
+
+
+def _search_fallback(queryset, terms):
+    for term in terms:
+        queryset = queryset.filter(Q(search_title__contains=term) | Q(search_body__contains=term))
+    return queryset.order_by('-is_featured', '-created_at', '-id')
+
+
+# --- AUTOCOMPLETE ---
+
+def _build_vocabulary():
+    """
+    Monta o vocabulário de sugestões a partir dos produtos ativos:
+    uma lista ordenada de (palavra_normalizada, rótulo) para busca com bisect.
+    """
+    from .models import Product
+
+    labels = set()
+    rows = Product.objects.filter(is_active=True).values_list('name', 'winery', 'grape', 'region', 'country')
+    for row in rows:
+        labels.update(value.strip() for value in row if value and value.strip())
+
+    entries = set()
+    for label in labels:
+        for word in normalize(label):
+            if len(word) >= 2:
+                entries.add((word, label))
+    return sorted(entries)
+
+
+def get_vocabulary():
+    vocabulary = cache.get(SUGGESTIONS_CACHE_KEY)
+    if vocabulary is None:
+        vocabulary = _build_vocabulary()
+        cache.set(SUGGESTIONS_CACHE_KEY, vocabulary, 300)
+    return vocabulary
+
+
+def invalidate_vocabulary():
+    cache.delete(SUGGESTIONS_CACHE_KEY)
+
+
+def _within_distance(a, b, limit):
+    """Distância de edição (Levenshtein) entre a e b é <= limit? Para cedo quando estoura."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+def suggest(text, limit=SUGGESTION_LIMIT):
+    """
+    Sugestões para o autocomplete. Primeiro por prefixo exato da última palavra
+    digitada; se faltar resultado, tolera erros de digitação (1 letra até 5
+    caracteres, 2 letras acima disso) comparando com o início das palavras
+    que têm a mesma primeira letra.
+    """
+    words = normalize(text)
+    if not words or len(words[-1]) < 2:
+        return []
+    prefix = words[-1]
+    vocabulary = get_vocabulary()
+
+    suggestions = []
+    index = bisect_left(vocabulary, (prefix, ''))
+    while index < len(vocabulary) and vocabulary[index][0].startswith(prefix):
+        label = vocabulary[index][1]
+        if label not in suggestions:
+            suggestions.append(label)
+            if len(suggestions) >= limit:
+                return suggestions
+        index += 1
+
+    if len(prefix) >= 3:
+        tolerance = 1 if len(prefix) <= 5 else 2
+        lengths = (len(prefix) - 1, len(prefix), len(prefix) + 1)
+        # Erro de digitação raramente está na primeira letra: compara só as palavras
+        # que começam com ela (faixa do bisect), e no máximo FUZZY_SCAN_LIMIT delas
+        start = bisect_left(vocabulary, (prefix[0], ''))
+        end = min(bisect_left(vocabulary, (chr(ord(prefix[0]) + 1), '')), start + FUZZY_SCAN_LIMIT)
+        for word, label in vocabulary[start:end]:
+            if label in suggestions:
+                continue
+            if any(_within_distance(prefix, word[:size], tolerance) for size in lengths):
+                suggestions.append(label)
+                if len(suggestions) >= limit:
+                    break
+    return suggestions
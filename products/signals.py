@@ -0,0 +1,49 @@
+# products/signals.py
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.images import generate_on_upload
+from .cart import invalidate_product_snapshot
+from .facets import apply_facet_delta, invalidate_facet_cache, product_facets
+from .models import Category, FacetCount, Product
+from .search import invalidate_vocabulary, remove_from_search_index, sync_search_index
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_facets(sender, instance, raw=False, **kwargs):
+    """Guarda as facetas do estado salvo no banco para calcular a diferença depois."""
+    instance._previous_facets = {}
+    if raw or instance.pk is None:
+        return
+    previous = Product.objects.select_related('category').filter(pk=instance.pk).first()
+    instance._previous_facets = product_facets(previous)
+
+
+@receiver(post_save, sender=Product)
+def update_facet_counts(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    apply_facet_delta(getattr(instance, '_previous_facets', {}), product_facets(instance))
+    sync_search_index(instance)
+    invalidate_vocabulary()
+    invalidate_product_snapshot(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def remove_facet_counts(sender, instance, **kwargs):
+    apply_facet_delta(product_facets(instance), {})
+    remove_from_search_index(instance.pk)
+    invalidate_vocabulary()
+    invalidate_product_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def rename_category_facet(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    FacetCount.objects.filter(facet='category', value=str(instance.pk)).update(label=instance.name)
+    invalidate_facet_cache()
+
+
+post_save.connect(generate_on_upload, sender=Product, dispatch_uid='product_image_derivatives')
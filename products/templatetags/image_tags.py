@@ -0,0 +1,47 @@
+from django import template
+from django.utils.html import format_html
+
+from core.images import DERIVATIVE_SIZES, derivative_urls
+
+register = template.Library()
+
+# Atributo "sizes" de cada slot: quanto da tela a imagem ocupa
+SLOT_SIZES = {
+    'thumb': '80px',
+    'card': '(max-width: 768px) 50vw, 25vw',
+    'detail': '(max-width: 768px) 100vw, 50vw',
+}
+
+
+def _srcset(urls):
+    return ', '.join(f"{urls[size]} {width}w" for size, width in DERIVATIVE_SIZES.items())
+
+
+@register.simple_tag
+def responsive_image(image, slot='card', alt='', css_class='', style='', lazy=True):
+    """
+    Renderiza a imagem no tamanho certo para o slot, com WebP + JPEG e srcset.
+    Uso: {% responsive_image product.image 'card' alt=product.name css_class='img-fluid' %}
+    """
+    if not image:
+        return ''
+
+    loading = 'lazy' if lazy else 'eager'
+    urls = derivative_urls(image)
+    if urls is None:
+        # Sem miniaturas disponíveis: usa o arquivo original
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="{}" decoding="async">',
+            image.url, alt, css_class, style, loading
+        )
+
+    sizes = SLOT_SIZES.get(slot, SLOT_SIZES['card'])
+    return format_html(
+        '<picture style="display: contents;">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" style="{}" loading="{}" decoding="async">'
+        '</picture>',
+        _srcset(urls['webp']), sizes,
+        urls['jpg'].get(slot, urls['jpg']['card']), _srcset(urls['jpg']), sizes,
+        alt, css_class, style, loading
+    )
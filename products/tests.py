@@ -1,3 +1,206 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from .cart import CART_MAX_QUANTITY, Cart, CartError
+from .facets import filtered_facet_counts
+from .models import Category, Product
+from .pagination import HOME_PAGE_SIZE
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-shared'},
+}
+
+
+@override_settings(CART_STORAGE='session', CACHES=LOCAL_CACHES)
+class CartApplyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Tintos')
+        cls.wine = Product.objects.create(
+            category=category, name='Malbec', description='Tinto', price='50.00', stock=10, image='products/x.jpg'
+        )
+        cls.inactive = Product.objects.create(
+            category=category, name='Merlot', description='Tinto', price='40.00', stock=10, image='products/y.jpg',
+            is_active=False
+        )
+
+    def make_cart(self):
+        request = RequestFactory().post('/')
+        request.session = SessionStore()
+        return Cart(request)
+
+    def test_applies_operations_in_order(self):
+        cart = self.make_cart()
+        cart.apply([
+            {'op': 'add', 'product_id': self.wine.id, 'quantity': 2},
+            {'op': 'add', 'product_id': str(self.wine.id)},
+            {'op': 'set', 'product_id': self.wine.id, 'quantity': 5},
+        ])
+        self.assertEqual(cart.cart, {str(self.wine.id): {'quantity': 5, 'price': '50.00'}})
+
+        cart.apply([{'op': 'remove', 'product_id': self.wine.id}])
+        self.assertEqual(cart.cart, {})
+
+    def test_invalid_product_id_raises_cart_error(self):
+        cart = self.make_cart()
+        for product_id in ('abc', None, '', [1], {'id': 1}, True, 1.5, 0, -3, '99999999999999999999999'):
+            with self.subTest(product_id=product_id):
+                with self.assertRaisesMessage(CartError, "Produto inválido."):
+                    cart.apply([{'op': 'add', 'product_id': product_id}])
+        with self.assertRaises(CartError):
+            cart.apply([{'op': 'remove'}])
+
+    def test_unknown_or_inactive_product(self):
+        cart = self.make_cart()
+        for product_id in (self.inactive.id, self.wine.id + 1000):
+            with self.subTest(product_id=product_id):
+                with self.assertRaises(CartError):
+                    cart.apply([{'op': 'add', 'product_id': product_id}])
+
+    def test_invalid_operation_and_quantity(self):
+        cart = self.make_cart()
+        invalid = [
+            ['add'],
+            [{'op': 'explode', 'product_id': self.wine.id}],
+            [{'op': 'add', 'product_id': self.wine.id, 'quantity': 'dois'}],
+            [{'op': 'add', 'product_id': self.wine.id, 'quantity': '2'}],
+            [{'op': 'add', 'product_id': self.wine.id, 'quantity': 2.9}],
+            [{'op': 'add', 'product_id': self.wine.id, 'quantity': True}],
+            [{'op': 'set', 'product_id': self.wine.id, 'quantity': None}],
+            [{'op': 'add', 'product_id': self.wine.id, 'quantity': 0}],
+            [{'op': 'set', 'product_id': self.wine.id, 'quantity': CART_MAX_QUANTITY + 1}],
+            [{'op': 'add', 'product_id': self.wine.id, 'quantity': CART_MAX_QUANTITY},
+             {'op': 'add', 'product_id': self.wine.id}],
+        ]
+        for operations in invalid:
+            with self.subTest(operations=operations):
+                with self.assertRaises(CartError):
+                    cart.apply(operations)
+
+    def test_invalid_batch_leaves_cart_untouched(self):
+        cart = self.make_cart()
+        cart.apply([{'op': 'add', 'product_id': self.wine.id, 'quantity': 2}])
+
+        with self.assertRaises(CartError):
+            cart.apply([
+                {'op': 'clear'},
+                {'op': 'add', 'product_id': 'abc'},
+            ])
+        self.assertEqual(cart.cart, {str(self.wine.id): {'quantity': 2, 'price': '50.00'}})
+
+    @override_settings(CART_MAX_LINES=1)
+    def test_line_limit(self):
+        category = self.wine.category
+        other = Product.objects.create(
+            category=category, name='Syrah', description='Tinto', price='30.00', image='products/z.jpg'
+        )
+        cart = self.make_cart()
+        with self.assertRaisesMessage(CartError, "1 produtos diferentes"):
+            cart.apply([
+                {'op': 'add', 'product_id': self.wine.id},
+                {'op': 'add', 'product_id': other.id},
+            ])
+        self.assertEqual(cart.cart, {})
+
+
+@override_settings(CART_STORAGE='session', CACHES=LOCAL_CACHES)
+class CartBatchViewTests(TestCase):
+    def post(self, body):
+        return self.client.post(reverse('products:cart_batch'), body, content_type='application/json')
+
+    def test_malformed_body_returns_400(self):
+        for body in (b'{', b'\xff\xfe', b'[1, 2]', b'"texto"'):
+            with self.subTest(body=body):
+                response = self.post(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+    def test_invalid_product_id_returns_400(self):
+        response = self.post(json.dumps({'operations': [{'op': 'add', 'product_id': 'abc'}]}))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], "Produto inválido.")
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CatalogSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Tintos')
+        for i in range(HOME_PAGE_SIZE + 3):
+            Product.objects.create(
+                category=category, name=f'Malbec {i}', description='Tinto', price='50.00', image='products/x.jpg',
+                grape='Malbec', country='Argentina' if i % 2 else 'Chile'
+            )
+        Product.objects.create(category=category, name='Merlot', description='Tinto', price='40.00',
+                               image='products/y.jpg', grape='Merlot')
+
+    def test_search_results_are_paginated(self):
+        url = reverse('products:catalog')
+        response = self.client.get(url, {'q': 'malbec'})
+        first = [p.id for p in response.context['products']]
+        self.assertEqual(len(first), HOME_PAGE_SIZE)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+        response = self.client.get(url, {'q': 'malbec', 'cursor': response.context['next_cursor']},
+                                   HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        data = response.json()
+        self.assertIsNone(data['next_cursor'])
+
+        response = self.client.get(url, {'q': 'malbec', 'cursor': str(HOME_PAGE_SIZE)})
+        second = [p.id for p in response.context['products']]
+        self.assertEqual(len(second), 3)
+        self.assertFalse(set(first) & set(second))
+
+    def test_search_counts_cover_all_results(self):
+        response = self.client.get(reverse('products:catalog'), {'q': 'malbec'})
+        facets = {facet['name']: facet['values'] for facet in response.context['facets']}
+        self.assertEqual(len(response.context['products']), HOME_PAGE_SIZE)
+        self.assertEqual([(item['value'], item['count']) for item in facets['grape']], [('Malbec', HOME_PAGE_SIZE + 3)])
+
+    def test_bad_cursor_restarts(self):
+        response = self.client.get(reverse('products:catalog'), {'q': 'malbec', 'cursor': 'x' * 50})
+        self.assertEqual(len(response.context['products']), HOME_PAGE_SIZE)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class FilteredFacetCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Tintos')
+        for i, (grape, country) in enumerate([
+            ('Malbec', 'Argentina'), ('Malbec', 'Argentina'), ('Malbec', 'Chile'),
+            ('Merlot', 'Chile'), ('Carmenere', 'Chile'),
+        ]):
+            Product.objects.create(category=category, name=f'Vinho {i}', description='Tinto', price='50.00',
+                                   image='products/x.jpg', grape=grape, country=country)
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self, facet_counts, facet):
+        return {item['value']: item['count'] for item in facet_counts[facet]}
+
+    def test_counts_with_filters(self):
+        facet_counts = filtered_facet_counts(QueryDict('grape=Malbec&country=Chile'))
+        # Cada faceta é contada com os filtros das outras
+        self.assertEqual(self.counts(facet_counts, 'grape'), {'Malbec': 1, 'Merlot': 1, 'Carmenere': 1})
+        self.assertEqual(self.counts(facet_counts, 'country'), {'Argentina': 2, 'Chile': 1})
+
+        # Valor marcado sem resultados continua na lista
+        facet_counts = filtered_facet_counts(QueryDict('grape=Merlot&country=Argentina'))
+        self.assertEqual(self.counts(facet_counts, 'country'), {'Chile': 1, 'Argentina': 0})
+
+    def test_constant_queries_with_filters(self):
+        url = reverse('products:catalog')
+        self.client.get(url, {'grape': 'Malbec'})
+        for params in ({'grape': 'Malbec'}, {'grape': ['Malbec', 'Merlot'], 'country': 'Chile'}):
+            with self.subTest(params=params), self.assertNumQueries(1):
+                # Só a página de produtos: as contagens saem do índice de ids em memória
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
@@ -5,9 +5,13 @@ app_name = 'products'
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('vitrine/pagina/', views.home_feed, name='home_feed'),
+    path('vinhos/', views.catalog, name='catalog'),
+    path('busca/sugestoes/', views.search_suggestions, name='search_suggestions'),
     path('produto/<slug:slug>/', views.product_detail, name='product_detail'),
     path('add/<int:product_id>/', views.cart_add, name='cart_add'),
     path('carrinho/', views.cart_detail, name='cart_detail'),
     path('carrinho/remover/<int:product_id>/', views.cart_remove, name='cart_remove'),
     path('carrinho/atualizar/<int:product_id>/', views.cart_update, name='cart_update'),
+    path('carrinho/api/', views.cart_batch, name='cart_batch'),
 ]
\ No newline at end of file
@@ -1,23 +1,110 @@
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.shortcuts import redirect
+from django.conf import settings
+from django.contrib import messages
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_POST
 from .models import Product
-from .cart import Cart
+from .cart import CART_LIMIT_MESSAGE, Cart, CartError
+import json
+from .pagination import paginate_products, paginate_ranked
+from .facets import FACETS, filter_products, filtered_facet_counts, get_facet_counts
+from .search import search_products, suggest
 
 
 def home(request):
-    # Buscamos produtos em destaque primeiro, depois os demais
-    products = Product.objects.filter(is_active=True).order_by('-is_featured', '-created_at')
-    return render(request, 'home.html', {'products': products})
+    # Buscamos produtos em destaque primeiro, depois os demais (uma página por vez)
+    cursor = request.GET.get('cursor')
+    products, next_cursor = paginate_products(Product.objects.filter(is_active=True), cursor)
+
+    return render(request, 'home.html', {
+        # A vitrine "Mais Vendidos" reaproveita o topo da primeira página (sem query extra)
+        'featured_products': products[:4] if not cursor else [],
+        'products': products,
+        'next_cursor': next_cursor,
+    })
+
+
+def home_feed(request):
+    """Próxima página da vitrine para a rolagem infinita (fragmento HTML + cursor)."""
+    products, next_cursor = paginate_products(
+        Product.objects.filter(is_active=True),
+        request.GET.get('cursor')
+    )
+    html = render_to_string('products/includes/product_page.html', {'products': products}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+
+def catalog(request):
+    """
+    Busca facetada da loja (ex: /vinhos/?grape=Malbec&country=Argentina).
+    Sem filtros as contagens vêm do índice FacetCount; com filtros/busca são
+    contadas em memória (facets.get_facet_ids) para a seleção atual.
+    Os resultados são paginados por cursor.
+    """
+    active = Product.objects.filter(is_active=True)
+    products, selected = filter_products(active, request.GET)
+    query = request.GET.get('q', '').strip()
+
+    if query:
+        # Com busca textual a ordem é a relevância: o cursor é a posição na lista ranqueada
+        products, next_cursor = paginate_ranked(search_products(products, query), request.GET.get('cursor'))
+    else:
+        products, next_cursor = paginate_products(products, request.GET.get('cursor'))
+
+    # Rolagem infinita: devolve só o fragmento da próxima página
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        html = render_to_string('products/includes/product_page.html', {'products': products}, request=request)
+        return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+    # Query string sem o cursor, usada nos links dos filtros e do "carregar mais"
+    params = request.GET.copy()
+    params.pop('cursor', None)
+
+    if query:
+        # Contagens dentro de todos os resultados da busca (não só da página atual)
+        matching = search_products(active, query).order_by().values_list('id', flat=True)
+        facet_counts = filtered_facet_counts(request.GET, set(matching))
+    elif selected:
+        # Contadas em memória sobre o índice de ids (sem GROUP BY por faceta)
+        facet_counts = filtered_facet_counts(request.GET)
+    else:
+        # Sem filtros: totais do catálogo, direto do índice
+        facet_counts = get_facet_counts()
+    facets = [
+        {'name': name, 'label': label, 'values': facet_counts.get(name, []), 'selected': selected.get(name, [])}
+        for name, label in FACETS.items()
+    ]
+
+    return render(request, 'products/catalog.html', {
+        'products': products,
+        'next_cursor': next_cursor,
+        'facets': facets,
+        'selected': selected,
+        'query': query,
+        'querystring': params.urlencode(),
+    })
+
+
+def search_suggestions(request):
+    """Autocomplete da busca: sugestões por prefixo, tolerando erros de digitação."""
+    return JsonResponse({'suggestions': suggest(request.GET.get('q', ''))})
 
 
 def cart_add(request, product_id):
     cart = Cart(request)
     product = get_object_or_404(Product, id=product_id)
-    cart.add(product=product, quantity=1)
+    added = cart.add(product=product, quantity=1)
 
     # Se a requisição for AJAX (JavaScript Fetch)
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        if not added:
+            return JsonResponse({
+                'success': False,
+                'total_items': len(cart),
+                'message': CART_LIMIT_MESSAGE.format(limit=settings.CART_MAX_LINES),
+            }, status=400)
         return JsonResponse({
             'total_items': len(cart),
             'product_name': product.name,
@@ -25,6 +112,8 @@ def cart_add(request, product_id):
         })
 
     # Se for um clique normal (sem JS), redireciona para o carrinho
+    if not added:
+        messages.error(request, CART_LIMIT_MESSAGE.format(limit=settings.CART_MAX_LINES))
     return redirect('products:cart_detail')
 
 def cart_detail(request):
@@ -48,7 +137,8 @@ def cart_update(request, product_id):
     action = request.POST.get('action')  # 'add' ou 'remove'
 
     if action == 'add':
-        cart.add(product=product, quantity=1)
+        if not cart.add(product=product, quantity=1):
+            messages.error(request, CART_LIMIT_MESSAGE.format(limit=settings.CART_MAX_LINES))
     elif action == 'remove':
         # Se a quantidade for 1, removemos o item, senão diminuímos
         if cart.cart[str(product.id)]['quantity'] > 1:
@@ -60,6 +150,31 @@ def cart_update(request, product_id):
     return redirect('products:cart_detail')
 
 
+@require_POST
+def cart_batch(request):
+    """
+    API em lote do carrinho: aplica várias operações numa requisição só
+    (o front-end agrupa os cliques de quantidade e manda tudo junto).
+    Corpo: {"operations": [{"op": "set", "product_id": 3, "quantity": 2}, ...]}
+    """
+    try:
+        operations = json.loads(request.body).get('operations')
+    except (UnicodeDecodeError, ValueError, AttributeError):
+        # JSONDecodeError é um ValueError
+        return JsonResponse({'success': False, 'message': 'JSON inválido.'}, status=400)
+
+    if not isinstance(operations, list) or not 0 < len(operations) <= 100:
+        return JsonResponse({'success': False, 'message': 'Envie de 1 a 100 operações.'}, status=400)
+
+    cart = Cart(request)
+    try:
+        cart.apply(operations)
+    except CartError as e:
+        return JsonResponse({'success': False, 'message': str(e), 'cart': cart.summary()}, status=400)
+
+    return JsonResponse({'success': True, 'cart': cart.summary()})
+
+
 def product_detail(request, slug):
     product = get_object_or_404(Product, slug=slug, is_active=True)
     # Busca 4 produtos da mesma categoria, excluindo o atual